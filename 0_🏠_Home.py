@@ -6,16 +6,16 @@ Welcome page for the Contract Management Dashboard.
 """
 
 import streamlit as st
+from dashboard_utils import configure_streamlit_page
 
 # ============================================================================
 # PAGE CONFIGURATION (MUST BE FIRST)
 # ============================================================================
 
-st.set_page_config(
+configure_streamlit_page(
     page_title="Contract Management Dashboard",
     page_icon="🏠",
-    layout="wide",
-    initial_sidebar_state="expanded"
+    layout="wide"
 )
 
 # ============================================================================
@@ -34,7 +34,7 @@ show_user_info_sidebar()
 # IMPORTS
 # ============================================================================
 
-from dashboard_utils import get_analyzer, format_currency
+from dashboard_utils import get_analyzer, cached_market_overview, format_currency
 
 # ============================================================================
 # HOME PAGE CONTENT
@@ -96,46 +96,71 @@ Navigate through the different analytical modules using the sidebar:
 # QUICK STATS PREVIEW
 # ============================================================================
 
+QUICK_STATS_CSS = """
+<style>
+.quick-stats {
+    display: grid;
+    grid-template-columns: repeat(4, 1fr);
+    gap: 1rem;
+    margin-bottom: 1rem;
+}
+.quick-stat-label {
+    font-size: 0.875rem;
+    opacity: 0.6;
+}
+.quick-stat-value {
+    font-size: 2.25rem;
+    line-height: 1.4;
+}
+</style>
+"""
+
 st.markdown("### 📈 Quick Dashboard Preview")
 
-try:
-    analyzer = get_analyzer()
-    market_data = analyzer.calculate_market_overview()
+QUICK_STATS = [
+    ("🏢 Total Suppliers", "Total number of unique suppliers"),
+    ("💰 Market Value", "Total procurement spending"),
+    ("📋 Total Items", "Total procurement items"),
+    ("📄 Active Contracts", "Number of unique contracts")
+]
+
+def quick_stats_html(values):
+    """Build the quick stats grid markup for the given display values"""
+    # One markdown element for the whole row instead of four metric widgets
+    cards = "".join(
+        f"<div class='quick-stat' title='{help_text}'>"
+        f"<div class='quick-stat-label'>{label}</div>"
+        f"<div class='quick-stat-value'>{value}</div>"
+        f"</div>"
+        for (label, help_text), value in zip(QUICK_STATS, values)
+    )
+    return QUICK_STATS_CSS + f"<div class='quick-stats'>{cards}</div>"
+
+@st.fragment
+def render_quick_stats():
+    """Render the quick stats preview as a fragment, isolated from full-page reruns"""
+    # Paint the grid skeleton first so the layout shows while the analyzer warms up
+    slot = st.empty()
+    slot.markdown(quick_stats_html(["…"] * len(QUICK_STATS)), unsafe_allow_html=True)
     
-    col1, col2, col3, col4 = st.columns(4)
-    
-    with col1:
-        st.metric(
-            "🏢 Total Suppliers",
+    try:
+        analyzer = get_analyzer()
+        market_data = cached_market_overview(analyzer)
+        
+        slot.markdown(quick_stats_html([
             f"{market_data['total_suppliers']:,}",
-            help="Total number of unique suppliers"
-        )
-    
-    with col2:
-        st.metric(
-            "💰 Market Value",
             format_currency(market_data['total_market_value']),
-            help="Total procurement spending"
-        )
-    
-    with col3:
-        st.metric(
-            "📋 Total Items",
             f"{market_data['total_items']:,}",
-            help="Total procurement items"
-        )
-    
-    with col4:
-        st.metric(
-            "📄 Active Contracts",
-            f"{market_data['total_contracts']:,}",
-            help="Number of unique contracts"
-        )
-    
-    st.info("💡 **Tip**: Navigate to specific sections for detailed analysis and insights.")
+            f"{market_data['total_contracts']:,}"
+        ]), unsafe_allow_html=True)
+        
+        st.info("💡 **Tip**: Navigate to specific sections for detailed analysis and insights.")
+
+    except Exception as e:
+        slot.empty()
+        st.warning("⚠️ Data loading in progress. Please refresh the page if this message persists.")
 
-except Exception as e:
-    st.warning("⚠️ Data loading in progress. Please refresh the page if this message persists.")
+render_quick_stats()
 
 # ============================================================================
 # FOOTER
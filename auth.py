@@ -7,7 +7,6 @@ import streamlit as st
 import hashlib
 import hmac
 import time
-from datetime import datetime, timedelta
 from typing import Optional, Dict, Any
 
 # ============================================================================
@@ -16,9 +15,56 @@ from typing import Optional, Dict, Any
 
 USERNAME = "kearney_user"
 PASSWORD_HASH = "d082eec54eb76af5dd25400494fadba55edeb842d2acb2fabe268527bfe2517f" 
+PASSWORD_DIGEST = bytes.fromhex(PASSWORD_HASH)
 SESSION_TIMEOUT_HOURS = 24
 MAX_LOGIN_ATTEMPTS = 5
 LOCKOUT_TIME_MINUTES = 15
+SESSION_TIMEOUT_SECONDS = SESSION_TIMEOUT_HOURS * 3600
+LOCKOUT_TIME_SECONDS = LOCKOUT_TIME_MINUTES * 60
+
+# Login page styles, emitted as a single element
+_LOGIN_CSS = """
+    <style>
+    /* Hide sidebar during login */
+    .css-1d391kg {display: none;}
+    .css-1rs6os {display: none;}
+    .css-17ziqus {display: none;}
+    section[data-testid="stSidebar"] {display: none;}
+    /* Login form styling */
+    .login-container {
+        max-width: 450px;
+        margin: 3rem auto;
+        padding: 2rem;
+        background: white;
+        border-radius: 10px;
+        box-shadow: 0 4px 6px rgba(0, 0, 0, 0.1);
+    }
+    .login-title {
+        text-align: center;
+        color: #2c3e50;
+        margin-bottom: 1.5rem;
+        font-size: 2.2rem;
+        font-weight: 600;
+    }
+    .login-subtitle {
+        text-align: center;
+        color: #7f8c8d;
+        margin-bottom: 2rem;
+    }
+    .stButton > button {
+        width: 100%;
+        background-color: #3498db;
+        color: white;
+        border: none;
+        padding: 0.6rem 1rem;
+        border-radius: 5px;
+        font-weight: 600;
+    }
+    .stButton > button:hover {
+        background-color: #2980b9;
+    }
+    </style>
+"""
 
 # ============================================================================
 # CORE FUNCTIONS
@@ -28,37 +74,28 @@ def hash_password(password: str) -> str:
     """Hash password with SHA-256."""
     return hashlib.sha256(password.encode()).hexdigest()
 
-def verify_password(password: str, hash_value: str) -> bool:
-    """Verify password against hash."""
-    return hmac.compare_digest(hash_password(password), hash_value)
+def verify_password(password: str, digest: bytes) -> bool:
+    """Verify password against a raw SHA-256 digest (timing-safe)."""
+    return hmac.compare_digest(hashlib.sha256(password.encode()).digest(), digest)
 
 def is_session_valid() -> bool:
     """Check if current session is valid."""
     if not st.session_state.get("authenticated", False):
         return False
     
-    login_time = st.session_state.get("login_timestamp")
-    if not login_time:
+    login_epoch = st.session_state.get("login_epoch")
+    if not login_epoch:
         return False
     
-    try:
-        login_datetime = datetime.fromisoformat(login_time)
-        expire_time = login_datetime + timedelta(hours=SESSION_TIMEOUT_HOURS)
-        return datetime.now() < expire_time
-    except (ValueError, TypeError):
-        return False
+    return time.time() < login_epoch + SESSION_TIMEOUT_SECONDS
 
 def is_locked_out() -> bool:
     """Check if user is locked out."""
-    lockout_until = st.session_state.get("lockout_until")
+    lockout_until = st.session_state.get("lockout_until_epoch")
     if not lockout_until:
         return False
     
-    try:
-        lockout_datetime = datetime.fromisoformat(lockout_until)
-        return datetime.now() < lockout_datetime
-    except (ValueError, TypeError):
-        return False
+    return time.time() < lockout_until
 
 def attempt_login(username: str, password: str) -> Dict[str, Any]:
     """Attempt user login."""
@@ -68,14 +105,14 @@ def attempt_login(username: str, password: str) -> Dict[str, Any]:
     
     attempts = st.session_state.get("login_attempts", 0)
     
-    if username == USERNAME and verify_password(password, PASSWORD_HASH):
+    if username == USERNAME and verify_password(password, PASSWORD_DIGEST):
         # Success
         st.session_state["authenticated"] = True
         st.session_state["username"] = username
-        st.session_state["login_timestamp"] = datetime.now().isoformat()
+        st.session_state["login_epoch"] = time.time()
         st.session_state["login_attempts"] = 0
-        if "lockout_until" in st.session_state:
-            del st.session_state["lockout_until"]
+        if "lockout_until_epoch" in st.session_state:
+            del st.session_state["lockout_until_epoch"]
         return {"success": True, "message": f"Welcome, {username}!"}
     else:
         # Failed
@@ -83,8 +120,7 @@ def attempt_login(username: str, password: str) -> Dict[str, Any]:
         st.session_state["login_attempts"] = attempts
         
         if attempts >= MAX_LOGIN_ATTEMPTS:
-            lockout_until = datetime.now() + timedelta(minutes=LOCKOUT_TIME_MINUTES)
-            st.session_state["lockout_until"] = lockout_until.isoformat()
+            st.session_state["lockout_until_epoch"] = time.time() + LOCKOUT_TIME_SECONDS
             return {"success": False, "message": f"Too many failed attempts. Locked for {LOCKOUT_TIME_MINUTES} minutes."}
         else:
             remaining = MAX_LOGIN_ATTEMPTS - attempts
@@ -95,17 +131,12 @@ def get_lockout_remaining() -> int:
     if not is_locked_out():
         return 0
     
-    lockout_until = st.session_state.get("lockout_until")
-    try:
-        lockout_datetime = datetime.fromisoformat(lockout_until)
-        remaining = lockout_datetime - datetime.now()
-        return max(0, int(remaining.total_seconds() / 60))
-    except (ValueError, TypeError):
-        return 0
+    remaining = st.session_state["lockout_until_epoch"] - time.time()
+    return max(0, int(remaining / 60))
 
 def logout_user():
     """Logout current user."""
-    keys_to_clear = ["authenticated", "username", "login_timestamp", "login_attempts", "lockout_until"]
+    keys_to_clear = ["authenticated", "username", "login_epoch", "login_attempts", "lockout_until_epoch"]
     for key in keys_to_clear:
         if key in st.session_state:
             del st.session_state[key]
@@ -126,6 +157,9 @@ def require_authentication() -> bool:
     Returns True if authenticated, shows login page if not.
     """
     if is_session_valid():
+        # Welcome message queued by a successful login on the previous run
+        if "_post_login_toast" in st.session_state:
+            st.toast(st.session_state.pop("_post_login_toast"))
         return True
     
     # Show login page
@@ -134,53 +168,7 @@ def require_authentication() -> bool:
 
 def show_login_page():
     """Display login page."""
-    # Hide sidebar during login
-    st.markdown("""
-        <style>
-        .css-1d391kg {display: none;}
-        .css-1rs6os {display: none;}
-        .css-17ziqus {display: none;}
-        section[data-testid="stSidebar"] {display: none;}
-        </style>
-    """, unsafe_allow_html=True)
-    
-    # Custom CSS
-    st.markdown("""
-        <style>
-        .login-container {
-            max-width: 450px;
-            margin: 3rem auto;
-            padding: 2rem;
-            background: white;
-            border-radius: 10px;
-            box-shadow: 0 4px 6px rgba(0, 0, 0, 0.1);
-        }
-        .login-title {
-            text-align: center;
-            color: #2c3e50;
-            margin-bottom: 1.5rem;
-            font-size: 2.2rem;
-            font-weight: 600;
-        }
-        .login-subtitle {
-            text-align: center;
-            color: #7f8c8d;
-            margin-bottom: 2rem;
-        }
-        .stButton > button {
-            width: 100%;
-            background-color: #3498db;
-            color: white;
-            border: none;
-            padding: 0.6rem 1rem;
-            border-radius: 5px;
-            font-weight: 600;
-        }
-        .stButton > button:hover {
-            background-color: #2980b9;
-        }
-        </style>
-    """, unsafe_allow_html=True)
+    st.markdown(_LOGIN_CSS, unsafe_allow_html=True)
     
     st.markdown("<div class='login-container'>", unsafe_allow_html=True)
     st.markdown("<h1 class='login-title'>🏠 Contract Management</h1>", unsafe_allow_html=True)
@@ -209,8 +197,7 @@ def show_login_page():
                     result = attempt_login(username, password)
                 
                 if result["success"]:
-                    st.success(result["message"])
-                    time.sleep(1)
+                    st.session_state["_post_login_toast"] = result["message"]
                     st.rerun()
                 else:
                     st.error(f"❌ {result['message']}")
@@ -231,16 +218,22 @@ def show_user_info_sidebar():
     if not is_session_valid():
         return
     
+    # Fragments can't call st.sidebar themselves, so enter it here
     with st.sidebar:
-        st.markdown("---")
-        st.markdown("### 👤 User Session")
-        
-        username = st.session_state.get("username", "Unknown")
-        st.success(f"**{username}**")
-        
-        # Logout button
-        if st.button("🚪 Logout", key="logout_btn"):
-            logout_user()
-            st.rerun()
-        
-        st.markdown("---")
\ No newline at end of file
+        _user_session_panel()
+
+@st.fragment
+def _user_session_panel():
+    """User session panel; widget interactions rerun only this fragment."""
+    st.markdown("---")
+    st.markdown("### 👤 User Session")
+    
+    username = st.session_state.get("username", "Unknown")
+    st.success(f"**{username}**")
+    
+    # Logout button
+    if st.button("🚪 Logout", key="logout_btn"):
+        logout_user()
+        st.rerun()
+    
+    st.markdown("---")
\ No newline at end of file
@@ -18,11 +18,10 @@ Usage:
 
 import streamlit as st
 import pandas as pd
-import plotly.express as px
-import plotly.graph_objects as go
-from plotly.subplots import make_subplots
 import numpy as np
+import threading
 import warnings
+from functools import lru_cache
 from pathlib import Path
 
 # Suppress warnings for cleaner output
@@ -103,18 +102,98 @@ CATEGORY_ICONS = {
 BASE_DIR = Path(__file__).parent
 DATA_DIR = BASE_DIR / 'data'
 
-@st.cache_data
+# Explicit CSV schemas (skip type inference, keep ids/amounts in 64-bit)
+CONTRACTS_DTYPES = {
+    'contract_id': 'int64',
+    'version': 'int32',
+    'supplier_id': 'int64',
+    'supplier_specialization': 'category',
+    'contract_domain': 'category',
+    'start_date': str,
+    'end_date': str,
+    'total_amount': 'float64',
+    'number_of_items': 'int32',
+    'hw_items': 'int32',
+    'sw_items': 'int32',
+    'service_items': 'int32'
+}
+
+ITEMS_DTYPES = {
+    'contract_number': 'int64',
+    'contract_id': 'int64',
+    'contract_domain': 'category',
+    'supplier_id': 'int64',
+    'item_id': 'int64',
+    'item_type': 'category',
+    'quantity': 'float64',
+    'unit_price': 'float64',
+    'total_price': 'float64',
+    'duration_years': 'int32',
+    'class_l1': 'category',
+    'class_l2': 'category',
+    'class_l3': 'category',
+    'class_confidence_level': 'category',
+    'class_final_score': 'float64',
+    'class_method': 'category',
+    'class_timestamp': 'datetime64[ns]',
+    'class_macro_type': 'category'
+}
+
+SUPPLIERS_DTYPES = {
+    'id': str,
+    'specialization': 'category',
+    'total_contracts': 'int32'
+}
+
+def _read_csv(filename: str, dtypes: dict) -> pd.DataFrame:
+    """Read a data CSV with the multi-threaded PyArrow parser and a fixed schema"""
+    return pd.read_csv(DATA_DIR / filename, engine='pyarrow', dtype=dtypes)
+
+def _ensure_parquet(filename: str, dtypes: dict) -> Path:
+    """
+    Convert a data CSV to a Parquet file stored next to it.
+    
+    The conversion runs only when the Parquet file is missing or older than
+    the CSV, so cold starts skip text parsing entirely.
+    
+    Returns:
+        Path: Location of the up-to-date Parquet file
+    """
+    csv_path = DATA_DIR / filename
+    parquet_path = csv_path.with_suffix('.parquet')
+    
+    if not parquet_path.exists() or parquet_path.stat().st_mtime < csv_path.stat().st_mtime:
+        # Write to a temporary file first so concurrent sessions never read a partial file
+        tmp_path = parquet_path.with_suffix('.parquet.tmp')
+        _read_csv(filename, dtypes).to_parquet(tmp_path, engine='pyarrow', compression='zstd', index=False)
+        tmp_path.replace(parquet_path)
+    
+    return parquet_path
+
+def _load_table(filename: str, dtypes: dict) -> pd.DataFrame:
+    """Load a data table from its Parquet copy, falling back to the CSV on read-only disks"""
+    try:
+        return pd.read_parquet(_ensure_parquet(filename, dtypes), engine='pyarrow')
+    except OSError:
+        return _read_csv(filename, dtypes)
+
+@st.cache_resource
 def load_data():
     """
-    Load CSV data files with caching for performance.
+    Load data files with caching for performance.
+    
+    CSVs are converted to Parquet on first use and read from there afterwards.
+    The frames are cached as shared resources and returned by reference
+    (no pickling or hashing on cache hits), so callers must treat them as
+    read-only and take a copy before mutating.
     
     Returns:
         tuple: (items_df, suppliers_df, contracts_df)
     """
     try:
-        contracts_df = pd.read_csv(DATA_DIR / 'contracts.csv')
-        items_df = pd.read_csv(DATA_DIR / 'items.csv')
-        suppliers_df = pd.read_csv(DATA_DIR / 'suppliers.csv')
+        contracts_df = _load_table('contracts.csv', CONTRACTS_DTYPES)
+        items_df = _load_table('items.csv', ITEMS_DTYPES)
+        suppliers_df = _load_table('suppliers.csv', SUPPLIERS_DTYPES)
         
         return items_df, suppliers_df, contracts_df
     except FileNotFoundError as e:
@@ -135,16 +214,116 @@ def get_analyzer():
     items_df, suppliers_df, contracts_df = load_data()
     return StrategyAnalyzer(items_df, suppliers_df, contracts_df)
 
+@st.cache_resource(show_spinner=False)
+def cached_market_overview(_analyzer):
+    """
+    Get cached market overview metrics.
+    
+    The analyzer argument is excluded from hashing (leading underscore): it is
+    the process-wide singleton from get_analyzer(), so one cache entry suffices.
+    The dict is cached as a resource and returned by reference, so cache hits
+    skip the pickle round trip of its Series; callers must not mutate it.
+    
+    Args:
+        _analyzer: StrategyAnalyzer instance
+        
+    Returns:
+        dict: Market overview statistics and metrics
+    """
+    return _analyzer.calculate_market_overview()
+
+@st.cache_data(show_spinner=False)
+def cached_supplier_metrics(_analyzer, category_filter_l1=None, category_filter_l2=None, category_filter_l3=None):
+    """
+    Get cached supplier metrics for a category filter combination.
+    
+    Keyed on the filter values only; the analyzer singleton is not hashed and
+    its items_clean frame is never mutated after init, so entries stay valid.
+    
+    Args:
+        _analyzer: StrategyAnalyzer instance
+        category_filter_l1: Optional L1 category filter
+        category_filter_l2: Optional L2 category filter
+        category_filter_l3: Optional L3 category filter
+        
+    Returns:
+        pd.DataFrame: Supplier metrics with strategic quadrants
+    """
+    return _analyzer.calculate_supplier_metrics(category_filter_l1, category_filter_l2, category_filter_l3)
+
+@st.cache_data(show_spinner=False)
+def cached_top_suppliers(_analyzer, l1=None, l2=None, l3=None, min_items=5, min_contracts=1, top_n=3):
+    """
+    Get cached top supplier recommendations for a filter combination.
+    
+    Keyed on the filter and threshold values, like cached_supplier_metrics().
+    
+    Args:
+        _analyzer: StrategyAnalyzer instance
+        l1, l2, l3: Optional category filters
+        min_items: Minimum number of items per supplier
+        min_contracts: Minimum number of contracts per supplier
+        top_n: Number of suppliers to return
+        
+    Returns:
+        pd.DataFrame: Top suppliers with profile classifications
+    """
+    return _analyzer.get_top_suppliers_by_category(
+        l1=l1, l2=l2, l3=l3, min_items=min_items, min_contracts=min_contracts, top_n=top_n
+    )
+
 # ============================================================================
 # STRATEGY ANALYZER CLASS
 # ============================================================================
 
+# Low-cardinality item columns used as grouping and filter keys
+CATEGORY_COLUMNS = ('class_l1', 'class_l2', 'class_l3')
+SUPPLIER_COLUMN = 'supplier_display_name'
+
+# Item columns consumed by the analyzer and by the pages reading items_clean
+ANALYZER_ITEM_COLUMNS = ['supplier_id', 'contract_number', *CATEGORY_COLUMNS, 'quantity', 'total_price']
+
+def _min_max_scale(values) -> np.ndarray:
+    """Min-max scale to [0, 1] (rounded to 3 decimals); 0.5 everywhere if all values are equal"""
+    arr = np.asarray(values, dtype=float)
+    lo, hi = np.nanmin(arr), np.nanmax(arr)
+    if hi == lo:
+        return np.full_like(arr, 0.5)
+    # One output buffer, updated in place (no temporaries per operation)
+    scaled = np.subtract(arr, lo)
+    scaled /= hi - lo
+    return np.round(scaled, 3, out=scaled)
+
+def _bin_labels(values, thresholds, labels, right=False) -> np.ndarray:
+    """
+    Label values by ascending thresholds in one pass: integer bin codes, then one label lookup.
+    
+    With right=False bin i holds thresholds[i-1] <= value < thresholds[i]; with
+    right=True the upper edge is inclusive instead. NaN values get labels[0].
+    """
+    arr = np.asarray(values, dtype=float)
+    codes = np.digitize(arr, thresholds, right=right)
+    codes[np.isnan(arr)] = 0
+    return np.asarray(labels, dtype=object)[codes]
+
+def _scale_to_max(values) -> np.ndarray:
+    """Scale by the maximum value (rounded to 3 decimals); 0 everywhere if the maximum is not positive"""
+    arr = np.asarray(values, dtype=float)
+    hi = np.nanmax(arr)
+    if not hi > 0:
+        return np.zeros_like(arr)
+    scaled = np.divide(arr, hi)
+    return np.round(scaled, 3, out=scaled)
+
 class StrategyAnalyzer:
     """
     Strategic Positioning Matrix Analysis Engine
     
     Main class for analyzing supplier performance, market positioning,
     and generating strategic insights for procurement decisions.
+    
+    The prepared frames (items_df, items_clean) are read-only after init;
+    the cached_* helpers above rely on this to key results on filters alone.
     """
     
     def __init__(self, items_df: pd.DataFrame, suppliers_df: pd.DataFrame, contracts_df: pd.DataFrame):
@@ -156,9 +335,16 @@ class StrategyAnalyzer:
             suppliers_df: Supplier master data
             contracts_df: Contract information
         """
-        self.items_df = items_df.copy()
-        self.suppliers_df = suppliers_df.copy() 
-        self.contracts_df = contracts_df.copy()
+        # Inputs are shared cached frames: only items_df gains columns, so it is
+        # projected to the columns actually used (a new frame; assignment never writes through)
+        self.items_df = items_df[ANALYZER_ITEM_COLUMNS]
+        self.suppliers_df = suppliers_df
+        self.contracts_df = contracts_df
+        
+        # Group/filter keys as categoricals: groupby and equality work on integer codes
+        for col in CATEGORY_COLUMNS:
+            if col in self.items_df.columns and not isinstance(self.items_df[col].dtype, pd.CategoricalDtype):
+                self.items_df[col] = self.items_df[col].astype('category')
         
         # Standardize supplier names using mapping table
         self._standardize_supplier_names()
@@ -166,35 +352,55 @@ class StrategyAnalyzer:
         # Clean and prepare data
         self.items_clean = self._clean_data()
         
+        # Category filter index: integer codes per row plus a value -> code lookup,
+        # so each filter is a single integer compare instead of a string scan
+        self._category_index = {
+            col: (
+                self.items_clean[col].cat.codes.to_numpy(),
+                {value: code for code, value in enumerate(self.items_clean[col].cat.categories)}
+            )
+            for col in CATEGORY_COLUMNS
+        }
+        
+        # Cascading filter options for every parent selection, resolved by dict lookup
+        self._category_options = self._build_category_options()
+        
+        # Raw arrays for bucketed (np.bincount) sums in the market overview
+        self._price = self.items_clean['total_price'].to_numpy(dtype=float)
+        self._supplier_codes = self.items_clean['supplier_display_name'].cat.codes.to_numpy()
+        
         # Calculate base metrics
         self.total_market_value = self.items_clean['total_price'].sum()
         
+        # Market overview depends only on the cleaned data: compute it once
+        self._market_overview = self._compute_market_overview()
+        
     def _standardize_supplier_names(self):
         """
         Standardize supplier names using the suppliers mapping table.
         Maps supplier_id to display_name for consistent reporting.
         """
         # Create mapping from supplier_id to display_name
-        supplier_mapping = {}
-        
-        for _, row in self.suppliers_df.iterrows():
-            if pd.notna(row['id']) and str(row['id']).startswith('supplier_'):
-                try:
-                    supplier_id_numeric = str(row['id']).replace('supplier_', '')
-                    supplier_id_numeric = int(float(supplier_id_numeric))
-                    supplier_mapping[supplier_id_numeric] = row['display_name']
-                except (ValueError, TypeError):
-                    continue
+        ids = self.suppliers_df['id'].astype(str)
+        mask = self.suppliers_df['id'].notna() & ids.str.startswith('supplier_')
+        numeric_ids = np.trunc(pd.to_numeric(ids[mask].str.slice(len('supplier_')), errors='coerce')).astype('Int64')
+        valid = numeric_ids.notna()
+        supplier_mapping = dict(zip(
+            numeric_ids[valid].astype(int),
+            self.suppliers_df.loc[mask, 'display_name'][valid]
+        ))
         
         # Apply mapping to items data
-        def map_supplier_id_to_name(supplier_id):
-            try:
-                supplier_id_numeric = int(float(supplier_id))
-                return supplier_mapping.get(supplier_id_numeric, f"Unknown_Supplier_{supplier_id_numeric}")
-            except (ValueError, TypeError):
-                return f"Invalid_Supplier_{supplier_id}"
+        raw_ids = self.items_df['supplier_id']
+        item_ids = np.trunc(pd.to_numeric(raw_ids, errors='coerce')).astype('Int64')
+        known = item_ids.isin(list(supplier_mapping))
+        display_names = item_ids.map(supplier_mapping).astype(object)
+        display_names[~known] = 'Unknown_Supplier_' + item_ids[~known].astype(str)
+        invalid = item_ids.isna()
+        display_names[invalid] = 'Invalid_Supplier_' + raw_ids[invalid].astype(object).map(str)
         
-        self.items_df['supplier_display_name'] = self.items_df['supplier_id'].apply(map_supplier_id_to_name)
+        # Grouped by on every page: store as categorical like CATEGORY_COLUMNS
+        self.items_df[SUPPLIER_COLUMN] = display_names.astype('category')
         
     def _clean_data(self):
         """
@@ -207,10 +413,101 @@ class StrategyAnalyzer:
             (self.items_df['total_price'].notna()) & 
             (self.items_df['total_price'] > 0) &
             (self.items_df['supplier_id'].notna())
-        ].copy()
+        ]
         
         return items_clean
     
+    def _build_category_options(self):
+        """
+        Precompute the hierarchical filter options from the distinct category paths.
+        
+        Returns:
+            dict: (level, parent_l1, parent_l2) -> tuple of options, "All" first
+        """
+        codes = np.column_stack([self._category_index[col][0] for col in CATEGORY_COLUMNS])
+        categories = [self.items_clean[col].cat.categories for col in CATEGORY_COLUMNS]
+        
+        options = {('l1', "All", "All"): set()}
+        for path in np.unique(codes, axis=0).tolist():
+            # Missing levels (code -1) narrow nothing and offer no option
+            l1, l2, l3 = (cats[code] if code >= 0 else None for cats, code in zip(categories, path))
+            if l1 is not None:
+                options[('l1', "All", "All")].add(l1)
+            
+            for parent_l1 in ("All", l1) if l1 is not None else ("All",):
+                l2_options = options.setdefault(('l2', parent_l1, "All"), set())
+                if l2 is not None:
+                    l2_options.add(l2)
+                
+                for parent_l2 in ("All", l2) if l2 is not None else ("All",):
+                    l3_options = options.setdefault(('l3', parent_l1, parent_l2), set())
+                    if l3 is not None:
+                        l3_options.add(l3)
+        
+        return {key: ("All",) + tuple(sorted(values)) for key, values in options.items()}
+    
+    def _category_mask(self, l1=None, l2=None, l3=None):
+        """Boolean row mask over items_clean for the given category filters"""
+        mask = np.ones(len(self.items_clean), dtype=bool)
+        
+        for column, value in zip(CATEGORY_COLUMNS, (l1, l2, l3)):
+            if value and value != "All":
+                codes, lookup = self._category_index[column]
+                mask &= codes == lookup.get(value, -2)  # -2 matches no row (NaN is -1)
+        
+        return mask
+    
+    def _filter_items(self, l1=None, l2=None, l3=None):
+        """Return items_clean rows matching the given category filters"""
+        mask = self._category_mask(l1, l2, l3)
+        return self.items_clean if mask.all() else self.items_clean[mask]
+    
+    def _base_supplier_agg(self, df_filtered, min_items=0, min_contracts=0):
+        """
+        Aggregate per-supplier base metrics and normalized price competitiveness.
+        
+        Shared by calculate_supplier_metrics() and get_top_suppliers_by_category().
+        
+        Args:
+            df_filtered: Items already filtered by category
+            min_items: Minimum items threshold (applied before normalization)
+            min_contracts: Minimum contracts threshold (applied before normalization)
+            
+        Returns:
+            pd.DataFrame: Supplier metrics indexed by supplier_display_name
+        """
+        # One 1D aggregation per column: each metric lands in its own contiguous
+        # array instead of a 2D (possibly Fortran-ordered) block from a dict agg
+        # Groups stay name-sorted: ties in later value sorts fall back to this order
+        grouped = df_filtered.groupby('supplier_display_name', observed=True)
+        prices = grouped['total_price']
+        supplier_metrics = pd.DataFrame({
+            'mean_total_price': prices.mean(),
+            'items_count': prices.count(),
+            'price_std': prices.std(),
+            'total_spending': prices.sum(),
+            'contracts_count': grouped['contract_number'].nunique(),
+            'l3_categories': grouped['class_l3'].nunique()
+        })
+        supplier_metrics['avg_price'] = supplier_metrics['mean_total_price']
+        
+        # Apply minimum items / contracts filters
+        supplier_metrics = supplier_metrics[
+            (supplier_metrics['items_count'] >= min_items) &
+            (supplier_metrics['contracts_count'] >= min_contracts)
+        ].copy()  # small per-supplier frame; columns are added below
+        
+        if len(supplier_metrics) == 0:
+            return supplier_metrics
+        
+        # Calculate price competitiveness (normalized)
+        overall_mean_price = df_filtered['total_price'].mean()
+        price_comp_raw = np.subtract(overall_mean_price, supplier_metrics['mean_total_price'].to_numpy())
+        price_comp_raw /= overall_mean_price
+        supplier_metrics['price_competitiveness'] = _min_max_scale(price_comp_raw)
+        
+        return supplier_metrics
+    
     def calculate_supplier_metrics(self, category_filter_l1=None, category_filter_l2=None, category_filter_l3=None):
         """
         Calculate comprehensive supplier metrics with optional category filters.
@@ -223,110 +520,108 @@ class StrategyAnalyzer:
         Returns:
             pd.DataFrame: Supplier metrics with positioning data
         """
-        df_filtered = self.items_clean.copy()
-        
         # Apply category filters
-        if category_filter_l1 and category_filter_l1 != "All":
-            df_filtered = df_filtered[df_filtered['class_l1'] == category_filter_l1]
-        if category_filter_l2 and category_filter_l2 != "All":
-            df_filtered = df_filtered[df_filtered['class_l2'] == category_filter_l2]
-        if category_filter_l3 and category_filter_l3 != "All":
-            df_filtered = df_filtered[df_filtered['class_l3'] == category_filter_l3]
+        df_filtered = self._filter_items(category_filter_l1, category_filter_l2, category_filter_l3)
         
         if len(df_filtered) == 0:
             return pd.DataFrame()
         
-        # Calculate base metrics per supplier
-        supplier_metrics = df_filtered.groupby('supplier_display_name').agg({
-            'total_price': ['mean', 'count', 'std', 'sum'],  # 4 columns (fixed: no duplicate key)
-            'contract_number': 'nunique',                     # 1 column
-            'class_l3': 'nunique'                            # 1 column  
-        })
-
-        # Now assign 6 column names instead of 7
-        supplier_metrics.columns = ['mean_total_price', 'items_count', 'price_std', 'total_spending',
-                                'contracts_count', 'l3_categories']
-
-        # Add avg_price as calculated column if needed
-        supplier_metrics['avg_price'] = supplier_metrics['mean_total_price']
-
-        # Calculate price competitiveness (normalized)
-        overall_mean_price = df_filtered['total_price'].mean()  # ← CAMBIATO da median()
-        price_comp_raw = (overall_mean_price - supplier_metrics['mean_total_price']) / overall_mean_price  # ← CAMBIATO nome colonna
-        
-        min_score = price_comp_raw.min()
-        max_score = price_comp_raw.max()
-        
-        if max_score != min_score:
-            supplier_metrics['price_competitiveness'] = (
-                (price_comp_raw - min_score) / (max_score - min_score)
-            ).round(3)
-        else:
-            supplier_metrics['price_competitiveness'] = 0.5
+        # Calculate base metrics and price competitiveness per supplier
+        supplier_metrics = self._base_supplier_agg(df_filtered)
         
         # Calculate spending impact (normalized)
-        max_spending = supplier_metrics['total_spending'].max()
-        supplier_metrics['spending_normalized'] = (
-            supplier_metrics['total_spending'] / max_spending
-        ).round(3)
+        supplier_metrics['spending_normalized'] = _scale_to_max(supplier_metrics['total_spending'])
         
         # Assign strategic quadrants
-        def assign_quadrant(row):
-            if row['price_competitiveness'] >= 0.5 and row['spending_normalized'] >= 0.5:
-                return 'Strategic Partners'
-            elif row['price_competitiveness'] >= 0.5 and row['spending_normalized'] < 0.5:
-                return 'Leverage Opportunities'
-            elif row['price_competitiveness'] < 0.5 and row['spending_normalized'] >= 0.5:
-                return 'Critical Negotiation'
-            else:
-                return 'Rationalize/Exit'
-        
-        supplier_metrics['quadrant'] = supplier_metrics.apply(assign_quadrant, axis=1)
+        # Quadrant code: bit 1 = not price competitive, bit 0 = low spending
+        competitive = supplier_metrics['price_competitiveness'].to_numpy() >= 0.5
+        high_spending = supplier_metrics['spending_normalized'].to_numpy() >= 0.5
+        quadrant_codes = (~competitive).astype(np.intp) * 2 + (~high_spending)
+        supplier_metrics['quadrant'] = np.asarray(
+            ['Strategic Partners', 'Leverage Opportunities', 'Critical Negotiation', 'Rationalize/Exit'],
+            dtype=object
+        )[quadrant_codes]
         supplier_metrics.reset_index(inplace=True)
         supplier_metrics.rename(columns={'supplier_display_name': 'supplier_name'}, inplace=True)
         
         return supplier_metrics
     
     def calculate_market_overview(self):
+        """
+        Get comprehensive market overview metrics.
+        
+        The metrics are precomputed at initialization; the returned dict is
+        shared and must not be mutated.
+        
+        Returns:
+            dict: Market overview statistics and metrics
+        """
+        return self._market_overview
+    
+    def _compute_market_overview(self):
         """
         Calculate comprehensive market overview metrics.
         
         Returns:
             dict: Market overview statistics and metrics
         """
+        # Bucketed sums over the integer codes: supplier totals, and supplier totals
+        # within each L1 category via the flattened (l1, supplier) code
+        price = self._price
+        supplier_codes = self._supplier_codes
+        supplier_names = self.items_clean['supplier_display_name'].cat.categories
+        l1_codes, l1_lookup = self._category_index['class_l1']
+        l1_names = self.items_clean['class_l1'].cat.categories
+        n_suppliers, n_l1 = len(supplier_names), len(l1_names)
+        
+        supplier_observed = np.bincount(supplier_codes, minlength=n_suppliers) > 0
+        supplier_totals = np.bincount(supplier_codes, weights=price, minlength=n_suppliers)
+        supplier_spending = pd.Series(
+            supplier_totals[supplier_observed],
+            index=pd.CategoricalIndex(supplier_names[supplier_observed], categories=supplier_names,
+                                      name='supplier_display_name')
+        )
+        
+        has_l1 = l1_codes >= 0
+        cell_totals = np.bincount(
+            l1_codes[has_l1].astype(np.intp) * n_suppliers + supplier_codes[has_l1],
+            weights=price[has_l1], minlength=n_l1 * n_suppliers
+        ).reshape(n_l1, n_suppliers)
+        l1_totals = cell_totals.sum(axis=1)
+        l1_observed = np.bincount(l1_codes[has_l1], minlength=n_l1) > 0
+        category_spending = pd.Series(
+            l1_totals[l1_observed],
+            index=pd.CategoricalIndex(l1_names[l1_observed], categories=l1_names, name='class_l1')
+        )
+        
         # Basic counts
         total_items = len(self.items_clean)
-        total_suppliers = self.items_clean['supplier_display_name'].nunique()
+        total_suppliers = len(supplier_spending)
         total_contracts = self.items_clean['contract_number'].nunique()
         
         # Market share calculations
-        supplier_spending = self.items_clean.groupby('supplier_display_name')['total_price'].sum().sort_values(ascending=False)
+        supplier_spending = supplier_spending.sort_values(ascending=False)
         supplier_market_share = (supplier_spending / self.total_market_value * 100).round(2)
         
-        category_spending = self.items_clean.groupby('class_l1')['total_price'].sum().sort_values(ascending=False)
+        category_spending = category_spending.sort_values(ascending=False)
         category_market_share = (category_spending / self.total_market_value * 100).round(2)
         
         # Market concentration metrics (HHI - Herfindahl-Hirschman Index)
         hhi_suppliers = (supplier_market_share ** 2).sum()
         
         # HHI by category L1
-        hhi_by_category = {}
-        for category in self.items_clean['class_l1'].dropna().unique():
-            cat_data = self.items_clean[self.items_clean['class_l1'] == category]
-            cat_supplier_spending = cat_data.groupby('supplier_display_name')['total_price'].sum()
-            cat_total = cat_supplier_spending.sum()
-            if cat_total > 0:
-                cat_market_share = (cat_supplier_spending / cat_total * 100)
-                hhi_by_category[category] = (cat_market_share ** 2).sum()
+        with np.errstate(divide='ignore', invalid='ignore'):
+            cat_hhi = ((cell_totals / l1_totals[:, None] * 100) ** 2).sum(axis=1)
+        # Keep categories in order of appearance
+        hhi_by_category = {
+            category: cat_hhi[l1_lookup[category]]
+            for category in self.items_clean['class_l1'].dropna().unique()
+            if l1_totals[l1_lookup[category]] > 0
+        }
         
         # Calculate 80% control (how many suppliers control 80% of market)
-        cumulative_share = 0
-        control_80_suppliers = 0
-        for share in supplier_market_share.values:
-            cumulative_share += share
-            control_80_suppliers += 1
-            if cumulative_share >= 80:
-                break
+        cumulative_share = supplier_market_share.to_numpy().cumsum()
+        control_80_suppliers = min(int(np.searchsorted(cumulative_share, 80)) + 1, len(cumulative_share))
         
         def interpret_hhi(hhi):
             """Interpret HHI concentration levels"""
@@ -365,56 +660,18 @@ class StrategyAnalyzer:
         Returns:
             pd.DataFrame: Top suppliers with performance metrics
         """
-        df_filtered = self.items_clean.copy()
-        
         # Apply category filters
-        if l1 and l1 != "All":
-            df_filtered = df_filtered[df_filtered['class_l1'] == l1]
-        if l2 and l2 != "All":
-            df_filtered = df_filtered[df_filtered['class_l2'] == l2]
-        if l3 and l3 != "All":
-            df_filtered = df_filtered[df_filtered['class_l3'] == l3]
+        df_filtered = self._filter_items(l1, l2, l3)
         
         if len(df_filtered) == 0:
             return pd.DataFrame()
         
-        # Calculate base metrics
-        supplier_metrics = df_filtered.groupby('supplier_display_name').agg({
-            'total_price': ['mean', 'count', 'std', 'sum'],  # FISSO: no chiavi duplicate
-            'contract_number': 'nunique',
-            'class_l3': 'nunique'
-        }).round(2)
-
-        # Assegna nomi colonne corretti (ora abbiamo esattamente 6 colonne)
-        supplier_metrics.columns = ['mean_total_price', 'items_count', 'price_std', 'total_spending',
-                                'contracts_count', 'l3_categories']
-
-        # Aggiungi avg_price
-        supplier_metrics['avg_price'] = supplier_metrics['mean_total_price']
-
-        # Apply minimum items filter
-        supplier_metrics = supplier_metrics[supplier_metrics['items_count'] >= min_items]
-        
-        # Apply minimum contracts filter
-        supplier_metrics = supplier_metrics[supplier_metrics['contracts_count'] >= min_contracts]
+        # Calculate base metrics and price competitiveness per supplier
+        supplier_metrics = self._base_supplier_agg(df_filtered, min_items, min_contracts)
    
         if len(supplier_metrics) == 0:
             print("Nessun supplier soddisfa i criteri minimum items")
             return pd.DataFrame()
-
-        # Calculate price competitiveness
-        category_mean_price = df_filtered['total_price'].mean()  # ← CAMBIATO da median()
-        price_comp_raw = (category_mean_price - supplier_metrics['mean_total_price']) / category_mean_price  # ← CAMBIATO
-        
-        min_score = price_comp_raw.min()
-        max_score = price_comp_raw.max()
-        
-        if max_score != min_score:
-            supplier_metrics['price_competitiveness'] = (
-                (price_comp_raw - min_score) / (max_score - min_score)
-            ).round(3)
-        else:
-            supplier_metrics['price_competitiveness'] = 0.5
         
         # Calculate market share in category
         category_total_spending = supplier_metrics['total_spending'].sum()
@@ -424,74 +681,46 @@ class StrategyAnalyzer:
         
         # Performance radar metrics
         # 1. Market Presence
-        max_spending_all = supplier_metrics['total_spending'].max()
-        supplier_metrics['market_presence'] = (
-            supplier_metrics['total_spending'] / max_spending_all
-        ).round(3)
+        supplier_metrics['market_presence'] = _scale_to_max(supplier_metrics['total_spending'])
         
         # 2. Category Coverage (L3)
-        max_l3_categories = supplier_metrics['l3_categories'].max()
-        supplier_metrics['category_coverage'] = (
-            supplier_metrics['l3_categories'] / max_l3_categories if max_l3_categories > 0 else 0
-        ).round(3)
+        supplier_metrics['category_coverage'] = _scale_to_max(supplier_metrics['l3_categories'])
         
         # 3. Price Stability (inverse of volatility)
-        supplier_metrics['price_volatility'] = supplier_metrics['price_std'] / supplier_metrics['avg_price']
-        max_stability = 1 / (supplier_metrics['price_volatility'].min() + 0.001)
-        supplier_metrics['price_stability'] = (
-            1 / (supplier_metrics['price_volatility'] + 0.001) / max_stability
-        ).round(3)
+        price_volatility = supplier_metrics['price_std'].to_numpy() / supplier_metrics['avg_price'].to_numpy()
+        supplier_metrics['price_volatility'] = price_volatility
+        max_stability = 1 / (np.nanmin(price_volatility) + 0.001)
+        price_stability = np.add(price_volatility, 0.001)
+        np.reciprocal(price_stability, out=price_stability)
+        price_stability /= max_stability
+        supplier_metrics['price_stability'] = np.round(price_stability, 3, out=price_stability)
         
         # Supplier classifications
         # Size classification
         spending_33 = supplier_metrics['total_spending'].quantile(0.33)
         spending_66 = supplier_metrics['total_spending'].quantile(0.66)
         
-        def classify_size(spending):
-            if spending >= spending_66:
-                return 'Large'
-            elif spending >= spending_33:
-                return 'Medium'
-            else:
-                return 'Small'
-        
-        supplier_metrics['supplier_size'] = supplier_metrics['total_spending'].apply(classify_size)
+        supplier_metrics['supplier_size'] = _bin_labels(
+            supplier_metrics['total_spending'], [spending_33, spending_66], ['Small', 'Medium', 'Large']
+        )
         
         # Performance level classification
-        def classify_performance(score):
-            if score >= 0.75:
-                return 'Excellent'
-            elif score >= 0.5:
-                return 'Good'
-            else:
-                return 'Average'
-        
-        supplier_metrics['performance_level'] = supplier_metrics['price_competitiveness'].apply(classify_performance)
+        supplier_metrics['performance_level'] = _bin_labels(
+            supplier_metrics['price_competitiveness'], [0.5, 0.75], ['Average', 'Good', 'Excellent']
+        )
         
         # Engagement level classification
         contracts_33 = supplier_metrics['contracts_count'].quantile(0.33)
         contracts_66 = supplier_metrics['contracts_count'].quantile(0.66)
         
-        def classify_engagement(contracts):
-            if contracts >= contracts_66:
-                return 'High'
-            elif contracts >= contracts_33:
-                return 'Medium'
-            else:
-                return 'Low'
-        
-        supplier_metrics['engagement_level'] = supplier_metrics['contracts_count'].apply(classify_engagement)
+        supplier_metrics['engagement_level'] = _bin_labels(
+            supplier_metrics['contracts_count'], [contracts_33, contracts_66], ['Low', 'Medium', 'High']
+        )
         
         # Specialization focus classification
-        def classify_specialization(l3_count):
-            if l3_count <= 3:
-                return 'Specialist'
-            elif l3_count <= 6:
-                return 'Focused'
-            else:
-                return 'Diversified'
-        
-        supplier_metrics['specialization_focus'] = supplier_metrics['l3_categories'].apply(classify_specialization)
+        supplier_metrics['specialization_focus'] = _bin_labels(
+            supplier_metrics['l3_categories'], [3, 6], ['Specialist', 'Focused', 'Diversified'], right=True
+        )
         
         # Sort by competitiveness and return top N
         supplier_metrics = supplier_metrics.sort_values('price_competitiveness', ascending=False)
@@ -516,34 +745,24 @@ def get_category_options(analyzer, level='l1', parent_filter=None):
     Returns:
         list: Available category options
     """
-    column_map = {
-        'l1': 'class_l1',
-        'l2': 'class_l2', 
-        'l3': 'class_l3'
-    }
-    
-    if level not in column_map:
+    if level not in ('l1', 'l2', 'l3'):
         return ["All"]
     
-    df = analyzer.items_clean
-    
-    # Apply parent filter if provided
-    if parent_filter and level != 'l1':
-        if level == 'l2' and parent_filter.get('l1') != "All":
-            df = df[df['class_l1'] == parent_filter['l1']]
-        elif level == 'l3':
-            if parent_filter.get('l1') != "All":
-                df = df[df['class_l1'] == parent_filter['l1']]
-            if parent_filter.get('l2') != "All":
-                df = df[df['class_l2'] == parent_filter['l2']]
+    # Only the parents relevant to this level form the cache key
+    parent_filter = parent_filter or {}
+    parent_l1 = parent_filter.get('l1', "All") if level != 'l1' else "All"
+    parent_l2 = parent_filter.get('l2', "All") if level == 'l3' else "All"
     
-    options = ["All"] + sorted(df[column_map[level]].dropna().unique().tolist())
-    return options
+    # Precomputed by the analyzer; parents with no matching items offer only "All"
+    return list(analyzer._category_options.get((level, parent_l1, parent_l2), ("All",)))
 
+@lru_cache(maxsize=4096)
 def format_currency(value, decimals=0):
     """
     Format numeric value as currency.
     
+    Results are memoized, since the same totals are re-rendered on every rerun.
+    
     Args:
         value: Numeric value
         decimals: Number of decimal places
@@ -551,10 +770,11 @@ def format_currency(value, decimals=0):
     Returns:
         str: Formatted currency string
     """
-    if pd.isna(value):
+    if value is None or value is pd.NA or value != value:  # NaN != NaN; cheaper than pd.isna
         return "€0"
     return f"€{value:,.{decimals}f}"
 
+@lru_cache(maxsize=4096)
 def format_percentage(value, decimals=1):
     """
     Format numeric value as percentage.
@@ -566,10 +786,74 @@ def format_percentage(value, decimals=1):
     Returns:
         str: Formatted percentage string
     """
-    if pd.isna(value):
+    if value is None or value is pd.NA or value != value:  # NaN != NaN; cheaper than pd.isna
         return "0.0%"
     return f"{value:.{decimals}f}%"
 
+def format_series(values: pd.Series, fmt: str, na_rep: str) -> pd.Series:
+    """
+    Format a numeric Series as display strings for tables.
+    
+    The missing-value mask is computed once and the present values are
+    formatted in a single list comprehension; missing values get na_rep.
+    
+    Args:
+        values: Numeric Series
+        fmt: str.format template for one value (e.g. "€{:,.0f}", "{:.1f}%")
+        na_rep: String used for missing values
+        
+    Returns:
+        pd.Series: Formatted strings, same index as values
+    """
+    present = values.notna().to_numpy()
+    formatted = np.full(len(values), na_rep, dtype=object)
+    formatted[present] = [fmt.format(value) for value in values.to_numpy()[present]]
+    return pd.Series(formatted, index=values.index)
+
+def lttb_indices(y, n_out, x=None) -> np.ndarray:
+    """
+    Select the points kept by Largest-Triangle-Three-Buckets downsampling.
+    
+    The first and last points are always kept; every bucket in between
+    contributes the point forming the largest triangle with the previously
+    kept point and the mean of the next bucket, so peaks and troughs survive.
+    
+    Args:
+        y: Series values
+        n_out: Number of points to keep
+        x: Point positions (defaults to evenly spaced)
+        
+    Returns:
+        np.ndarray: Sorted positions of the kept points
+    """
+    y = np.asarray(y, dtype=float)
+    n = len(y)
+    if n_out >= n or n_out < 3:
+        return np.arange(n)
+    x = np.arange(n, dtype=float) if x is None else np.asarray(x, dtype=float)
+    
+    # n_out - 2 buckets over the interior points
+    edges = np.linspace(1, n - 1, n_out - 1).astype(np.intp)
+    selected = np.empty(n_out, dtype=np.intp)
+    selected[0], selected[-1] = 0, n - 1
+    
+    a = 0
+    for bucket in range(n_out - 2):
+        start, stop = edges[bucket], edges[bucket + 1]
+        if bucket < n_out - 3:
+            next_x = x[stop:edges[bucket + 2]].mean()
+            next_y = y[stop:edges[bucket + 2]].mean()
+        else:
+            next_x, next_y = x[-1], y[-1]
+        
+        areas = np.abs(
+            (x[a] - next_x) * (y[start:stop] - y[a]) - (x[a] - x[start:stop]) * (next_y - y[a])
+        )
+        a = start + int(np.argmax(areas))
+        selected[bucket + 1] = a
+    
+    return selected
+
 def create_performance_radar(supplier_data, metrics=['price_competitiveness', 'market_presence', 'category_coverage', 'price_stability']):
     """
     Create radar chart for supplier performance metrics.
@@ -581,23 +865,26 @@ def create_performance_radar(supplier_data, metrics=['price_competitiveness', 'm
     Returns:
         plotly.graph_objects.Figure: Radar chart
     """
+    # Plotly is imported lazily so pages that never chart skip its import graph
+    import plotly.graph_objects as go
+    
     if len(supplier_data) == 0:
         return go.Figure()
     
     fig = go.Figure()
     
-    for idx, row in supplier_data.iterrows():
-        values = [row[metric] * 100 for metric in metrics]  # Convert to percentage
-        values.append(values[0])  # Close the radar
-        
-        metric_labels = [metric.replace('_', ' ').title() for metric in metrics]
-        metric_labels.append(metric_labels[0])  # Close the radar
-        
+    values = supplier_data[list(metrics)].to_numpy(dtype=float) * 100  # Convert to percentage
+    values = np.hstack([values, values[:, :1]])  # Close the radar
+    
+    metric_labels = [metric.replace('_', ' ').title() for metric in metrics]
+    metric_labels.append(metric_labels[0])  # Close the radar
+    
+    for supplier_name, supplier_values in zip(supplier_data['supplier_name'].tolist(), values):
         fig.add_trace(go.Scatterpolar(
-            r=values,
+            r=supplier_values,
             theta=metric_labels,
             fill='toself',
-            name=row['supplier_name']
+            name=supplier_name
         ))
     
     fig.update_layout(
@@ -612,6 +899,29 @@ def create_performance_radar(supplier_data, metrics=['price_competitiveness', 'm
     
     return fig
 
+# ============================================================================
+# BACKGROUND PREFETCH
+# ============================================================================
+
+def _prefetch_analyzer():
+    """
+    Warm the data and analyzer caches off the script thread.
+    
+    Started once at import, so loading overlaps the login page. A page that
+    needs the analyzer meanwhile waits on the cache's compute lock instead of
+    loading twice; failures are left for that page call to report.
+    """
+    try:
+        get_analyzer()
+    except BaseException:  # st.stop() raises a BaseException subclass
+        pass
+
+# Started after all definitions so the thread never sees a half-initialized module.
+# Only under a Streamlit server: plain imports (scripts, tooling) must not leave a
+# loader thread running while the interpreter shuts down.
+if st.runtime.exists():
+    threading.Thread(target=_prefetch_analyzer, name='analyzer-prefetch', daemon=True).start()
+
 # ============================================================================
 # VERSION INFO
 # ============================================================================
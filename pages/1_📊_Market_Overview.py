@@ -9,8 +9,10 @@ Shows market distribution, top suppliers, and category-specific analytics.
 import streamlit as st
 import plotly.express as px
 import plotly.graph_objects as go
+import plotly.io as pio
 from dashboard_utils import (
     get_analyzer, 
+    cached_market_overview,
     CATEGORY_COLORS, 
     CATEGORY_ICONS,
     configure_streamlit_page,
@@ -28,6 +30,117 @@ configure_streamlit_page(
     layout="wide"
 )
 
+# ============================================================================
+# CHART BUILDERS
+# ============================================================================
+# Figures are cached as Plotly JSON keyed by their input data, so reruns skip
+# the Plotly Express pipeline and only rebuild the figure from its spec.
+
+@st.cache_data(show_spinner=False)
+def build_category_pie(category_market_share):
+    """Build the market share by category pie chart"""
+    fig_categories_pie = px.pie(
+        values=category_market_share.values,
+        names=category_market_share.index,
+        title="",
+        color_discrete_map=CATEGORY_COLORS
+    )
+    fig_categories_pie.update_layout(height=400)
+    return fig_categories_pie.to_json()
+
+@st.cache_data(show_spinner=False)
+def build_top_suppliers_bar(top_15_suppliers):
+    """Build the top suppliers by market share bar chart"""
+    # Reverse order for better visualization (top 1 at top)
+    fig_suppliers = px.bar(
+        x=top_15_suppliers.values[::-1],  # Reverse values
+        y=top_15_suppliers.index[::-1],   # Reverse names
+        orientation='h',
+        title="",
+        labels={'x': 'Market Share (%)', 'y': ''},
+        color=top_15_suppliers.values[::-1],
+        color_continuous_scale='Blues'
+    )
+    
+    fig_suppliers.update_layout(height=400, showlegend=False)
+    return fig_suppliers.to_json()
+
+@st.cache_data(show_spinner=False)
+def build_category_suppliers_bar(_analyzer, category):
+    """Build the top 10 suppliers bar chart for an L1 category (None when it has no items)"""
+    # Filter data for category
+    category_data = _analyzer.items_clean[_analyzer.items_clean['class_l1'] == category]
+    
+    if len(category_data) == 0:
+        return None
+    
+    # Calculate market share for category
+    category_suppliers = category_data.groupby('supplier_display_name', observed=True)['total_price'].sum()
+    category_total = category_suppliers.sum()
+    
+    # Get top 10 suppliers for this category (partial selection, no full sort)
+    top_10_category = (category_suppliers.nlargest(10) / category_total * 100).round(1)
+    
+    # Create chart with consistent colors
+    fig_category = px.bar(
+        x=top_10_category.values[::-1],  # Reverse for top at top
+        y=top_10_category.index[::-1],   # Reverse names
+        orientation='h',
+        title=f"{CATEGORY_ICONS[category]} {category}",
+        labels={'x': 'Market Share (%)', 'y': ''},
+        color_discrete_sequence=[CATEGORY_COLORS.get(category, '#3498db')]
+    )
+    
+    fig_category.update_layout(
+        height=400, 
+        showlegend=False,
+        title=dict(font=dict(size=16)),
+        margin=dict(l=0, r=0, t=40, b=0)
+    )
+    return fig_category.to_json()
+
+@st.cache_data(show_spinner=False)
+def build_market_share_heatmap(_analyzer, top_15_supplier_names, categories_l1):
+    """Build the supplier × category market share heatmap"""
+    # One pass over the items for all supplier × category cells
+    items = _analyzer.items_clean
+    supplier_category_spending = (
+        items[items['supplier_display_name'].isin(top_15_supplier_names)]
+        .groupby(['supplier_display_name', 'class_l1'], observed=True, sort=False)['total_price'].sum()
+        .unstack(fill_value=0)
+        .reindex(index=top_15_supplier_names, columns=categories_l1, fill_value=0)
+    )
+    
+    # REVERSE ORDER: Top supplier at bottom, #15 at top
+    heatmap_data = (supplier_category_spending.to_numpy() / _analyzer.total_market_value * 100)[::-1]
+    heatmap_text = [
+        [f"{market_share_pct:.1f}%" if market_share_pct > 0 else "" for market_share_pct in supplier_row]
+        for supplier_row in heatmap_data
+    ]
+    
+    # Create heatmap with Plotly - FULL WIDTH
+    fig_heatmap = go.Figure(data=go.Heatmap(
+        z=heatmap_data,
+        x=categories_l1,
+        y=list(reversed(top_15_supplier_names)),  # REVERSE Y LABELS TOO
+        colorscale='Blues',
+        text=heatmap_text,
+        texttemplate="%{text}",
+        textfont={"size": 10},
+        showscale=True,
+        colorbar=dict(title="Market Share %"),
+        hoverongaps=False
+    ))
+    
+    fig_heatmap.update_layout(
+        title="Supplier × Category Market Share Distribution (%)",
+        height=500,  # Taller for 15 suppliers
+        xaxis_title="Category L1",
+        yaxis_title="Top 15 Suppliers (Ranked by Total Market Share)",
+        font=dict(size=11)
+    )
+    return fig_heatmap.to_json()
+
 # ============================================================================
 # MARKET OVERVIEW PAGE
 # ============================================================================
@@ -38,7 +151,7 @@ st.markdown("---")
 
 # Get analyzer and calculate market data
 analyzer = get_analyzer()
-market_data = analyzer.calculate_market_overview()
+market_data = cached_market_overview(analyzer)
 
 # ============================================================================
 # KEY METRICS SECTION
@@ -104,32 +217,14 @@ col1, col2 = st.columns(2)
 with col1:
     st.markdown("### 📈 Market Share by Category")
     
-    fig_categories_pie = px.pie(
-        values=market_data['category_market_share'].values,
-        names=market_data['category_market_share'].index,
-        title="",
-        color_discrete_map=CATEGORY_COLORS
-    )
-    fig_categories_pie.update_layout(height=400)
+    fig_categories_pie = pio.from_json(build_category_pie(market_data['category_market_share']))
     st.plotly_chart(fig_categories_pie, use_container_width=True)
 
 with col2:
     st.markdown("### 🏆 Top 15 Suppliers by Market Share")
     
     top_15_suppliers = market_data['supplier_market_share'].head(15)
-    
-    # Reverse order for better visualization (top 1 at top)
-    fig_suppliers = px.bar(
-        x=top_15_suppliers.values[::-1],  # Reverse values
-        y=top_15_suppliers.index[::-1],   # Reverse names
-        orientation='h',
-        title="",
-        labels={'x': 'Market Share (%)', 'y': ''},
-        color=top_15_suppliers.values[::-1],
-        color_continuous_scale='Blues'
-    )
-    
-    fig_suppliers.update_layout(height=400, showlegend=False)
+    fig_suppliers = pio.from_json(build_top_suppliers_bar(top_15_suppliers))
     st.plotly_chart(fig_suppliers, use_container_width=True)
 
 st.markdown("---")
@@ -145,34 +240,10 @@ categories = ['SERVIZIO', 'HW', 'SW']
 col1, col2, col3 = st.columns(3)
 
 for idx, category in enumerate(categories):
-    # Filter data for category
-    category_data = analyzer.items_clean[analyzer.items_clean['class_l1'] == category]
+    category_chart = build_category_suppliers_bar(analyzer, category)
     
-    if len(category_data) > 0:
-        # Calculate market share for category
-        category_suppliers = category_data.groupby('supplier_display_name')['total_price'].sum().sort_values(ascending=False)
-        category_total = category_suppliers.sum()
-        category_market_share = (category_suppliers / category_total * 100).round(1)
-        
-        # Get top 10 suppliers for this category
-        top_10_category = category_market_share.head(10)
-        
-        # Create chart with consistent colors
-        fig_category = px.bar(
-            x=top_10_category.values[::-1],  # Reverse for top at top
-            y=top_10_category.index[::-1],   # Reverse names
-            orientation='h',
-            title=f"{CATEGORY_ICONS[category]} {category}",
-            labels={'x': 'Market Share (%)', 'y': ''},
-            color_discrete_sequence=[CATEGORY_COLORS.get(category, '#3498db')]
-        )
-        
-        fig_category.update_layout(
-            height=400, 
-            showlegend=False,
-            title=dict(font=dict(size=16)),
-            margin=dict(l=0, r=0, t=40, b=0)
-        )
+    if category_chart is not None:
+        fig_category = pio.from_json(category_chart)
         
         # Display in corresponding column
         if idx == 0:
@@ -197,48 +268,7 @@ st.markdown("### 🔥 Market Share Distribution Heatmap")
 top_15_supplier_names = market_data['supplier_market_share'].head(15).index
 categories_l1 = market_data['category_market_share'].index
 
-heatmap_data = []
-heatmap_text = []
-
-# REVERSE ORDER: Top supplier at bottom, #15 at top
-for supplier in reversed(top_15_supplier_names):
-    supplier_row = []
-    text_row = []
-    for category in categories_l1:
-        # Calculate market share % for this combination
-        supplier_cat_spending = analyzer.items_clean[
-            (analyzer.items_clean['supplier_display_name'] == supplier) &
-            (analyzer.items_clean['class_l1'] == category)
-        ]['total_price'].sum()
-        
-        market_share_pct = (supplier_cat_spending / analyzer.total_market_value * 100)
-        supplier_row.append(market_share_pct)
-        text_row.append(f"{market_share_pct:.1f}%" if market_share_pct > 0 else "")
-    
-    heatmap_data.append(supplier_row)
-    heatmap_text.append(text_row)
-
-# Create heatmap with Plotly - FULL WIDTH
-fig_heatmap = go.Figure(data=go.Heatmap(
-    z=heatmap_data,
-    x=categories_l1,
-    y=list(reversed(top_15_supplier_names)),  # REVERSE Y LABELS TOO
-    colorscale='Blues',
-    text=heatmap_text,
-    texttemplate="%{text}",
-    textfont={"size": 10},
-    showscale=True,
-    colorbar=dict(title="Market Share %"),
-    hoverongaps=False
-))
-
-fig_heatmap.update_layout(
-    title="Supplier × Category Market Share Distribution (%)",
-    height=500,  # Taller for 15 suppliers
-    xaxis_title="Category L1",
-    yaxis_title="Top 15 Suppliers (Ranked by Total Market Share)",
-    font=dict(size=11)
-)
+fig_heatmap = pio.from_json(build_market_share_heatmap(analyzer, list(top_15_supplier_names), list(categories_l1)))
 
 # FULL WIDTH
 st.plotly_chart(fig_heatmap, use_container_width=True)
@@ -1,10 +1,12 @@
 import streamlit as st
 import pandas as pd
+import numpy as np
 import plotly.express as px
 import plotly.graph_objects as go
-from dashboard_utils import get_analyzer, STRATEGIC_COLORS
+import plotly.io as pio
+from dashboard_utils import get_analyzer, get_category_options, configure_streamlit_page, format_series, STRATEGIC_COLORS
 
-st.set_page_config(
+configure_streamlit_page(
     page_title="Strategic Positioning - Strategic Dashboard", 
     page_icon="🎯", 
     layout="wide"
@@ -85,29 +87,17 @@ analyzer = get_analyzer()
 col1, col2, col3 = st.columns(3)
 
 with col1:
-    l1_options = ["All"] + sorted(analyzer.items_clean['class_l1'].dropna().unique().tolist())
+    l1_options = get_category_options(analyzer, 'l1')
     selected_l1 = st.selectbox("Category L1", l1_options, key="matrix_l1")
 
 with col2:
-    if selected_l1 != "All":
-        l2_data = analyzer.items_clean[analyzer.items_clean['class_l1'] == selected_l1]['class_l2'].dropna().unique()
-        l2_options = ["All"] + sorted(l2_data.tolist())
-    else:
-        l2_options = ["All"] + sorted(analyzer.items_clean['class_l2'].dropna().unique().tolist())
+    l2_options = get_category_options(analyzer, 'l2', {'l1': selected_l1})
     selected_l2 = st.selectbox("Category L2", l2_options, key="matrix_l2")
 
 with col3:
-    if selected_l2 != "All":
-        if selected_l1 != "All":
-            l3_data = analyzer.items_clean[
-                (analyzer.items_clean['class_l1'] == selected_l1) &
-                (analyzer.items_clean['class_l2'] == selected_l2)
-            ]['class_l3'].dropna().unique()
-        else:
-            l3_data = analyzer.items_clean[analyzer.items_clean['class_l2'] == selected_l2]['class_l3'].dropna().unique()
-        l3_options = ["All"] + sorted(l3_data.tolist())
-    else:
-        l3_options = ["All"] + sorted(analyzer.items_clean['class_l3'].dropna().unique().tolist())
+    # L3 is narrowed by L1 only once an L2 is selected
+    l3_parent_l1 = selected_l1 if selected_l2 != "All" else "All"
+    l3_options = get_category_options(analyzer, 'l3', {'l1': l3_parent_l1, 'l2': selected_l2})
     selected_l3 = st.selectbox("Category L3", l3_options, key="matrix_l3")
 
 # CATEGORY FILTER ACTIVE INFO - AGGIUNTO
@@ -122,38 +112,52 @@ if selected_l3 != "All":
 if category_desc:
     st.info(f"📁 **Category Filter Active:** {' | '.join(category_desc)}")
 
-# Calcola metriche con filtri - VERSIONE CORRETTA
-df_filtered = analyzer.items_clean.copy()
-
-# Applica filtri
-if selected_l1 and selected_l1 != "All":
-    df_filtered = df_filtered[df_filtered['class_l1'] == selected_l1]
-if selected_l2 and selected_l2 != "All":
-    df_filtered = df_filtered[df_filtered['class_l2'] == selected_l2]
-if selected_l3 and selected_l3 != "All":
-    df_filtered = df_filtered[df_filtered['class_l3'] == selected_l3]
-
-if len(df_filtered) == 0:
-    st.warning("📊 No data available for the selected filters. Try adjusting your selection.")
-else:
+@st.cache_data(show_spinner=False)
+def compute_positioning(_analyzer, selected_l1, selected_l2, selected_l3):
+    """
+    Build the strategic positioning table for a category filter selection.
+    
+    Cached per (L1, L2, L3) selection; the analyzer singleton is not hashed
+    and its items_clean frame is read-only, so entries stay valid.
+    
+    Returns:
+        pd.DataFrame: One row per supplier with matrix coordinates and quadrant,
+        empty if no items match the filters
+    """
+    # Applica filtri: un'unica maschera sui codici delle categorie, una sola selezione
+    df_filtered = _analyzer._filter_items(selected_l1, selected_l2, selected_l3)
+
+    if len(df_filtered) == 0:
+        return pd.DataFrame()
+    
     # Calcola metriche per fornitore con NORMALIZZAZIONE CORRETTA
-    supplier_metrics = df_filtered.groupby('supplier_display_name').agg({
-        'total_price': ['mean', 'median', 'count', 'std', 'sum'],  # ← UNIFICATO in una sola riga
-        'contract_number': 'nunique',
-        'quantity': 'sum'
-    }).round(2)
+    supplier_groups = df_filtered.groupby('supplier_display_name', observed=True)
+    price_stats = supplier_groups['total_price'].agg(['mean', 'median', 'count', 'std', 'sum'])
+    
+    # Contratti distinti: un'unica deduplicazione globale invece di un nunique per gruppo
+    contracts_count = (
+        df_filtered.drop_duplicates(['supplier_display_name', 'contract_number'])
+        .groupby('supplier_display_name', observed=True).size()
+    )
+    supplier_metrics = price_stats.assign(
+        contracts_count=contracts_count,
+        total_quantity=supplier_groups['quantity'].sum()
+    ).round(2)
 
     supplier_metrics.columns = ['avg_total_price', 'mean_total_price', 'items_count', 'price_std', 
                             'total_spending', 'contracts_count', 'total_quantity']  # ← 7 colonne
 
     # PRICE COMPETITIVENESS: Normalizzazione PERCENTILE
     overall_mean_price = df_filtered['total_price'].mean()  # ← CAMBIATO da median()
-    price_comp_raw = (overall_mean_price - supplier_metrics['mean_total_price']) / overall_mean_price  # ← CAMBIATO
-
-    # Usa normalizzazione percentile invece di min-max
-    supplier_metrics['price_competitiveness'] = (
-        pd.Series(price_comp_raw).rank(pct=True, method='min')
-    ).round(3)
+    price_comp_raw = (overall_mean_price - supplier_metrics['mean_total_price'].to_numpy()) / overall_mean_price  # ← CAMBIATO
+
+    # Usa normalizzazione percentile invece di min-max: rank 'min' = posizione del primo
+    # valore uguale nell'array ordinato (+1), diviso per il numero di valori validi
+    valid = ~np.isnan(price_comp_raw)
+    sorted_raw = np.sort(price_comp_raw[valid])
+    min_rank = np.searchsorted(sorted_raw, price_comp_raw, side='left') + 1.0
+    min_rank[~valid] = np.nan
+    supplier_metrics['price_competitiveness'] = np.round(min_rank / len(sorted_raw), 3)
     
     # SPENDING: Normalizzazione Min-Max (manteniamo come prima)
     max_spending = supplier_metrics['total_spending'].max()
@@ -161,18 +165,11 @@ else:
         supplier_metrics['total_spending'] / max_spending
     ).round(3)
     
-    # Assegna quadrante
-    def assign_quadrant(row):
-        if row['price_competitiveness'] >= 0.5 and row['spending_normalized'] >= 0.5:
-            return 'Strategic Partners'
-        elif row['price_competitiveness'] >= 0.5 and row['spending_normalized'] < 0.5:
-            return 'Leverage Opportunities'
-        elif row['price_competitiveness'] < 0.5 and row['spending_normalized'] >= 0.5:
-            return 'Critical Negotiations'
-        else:
-            return 'Rationalize/Exit'
-    
-    supplier_metrics['quadrant'] = supplier_metrics.apply(assign_quadrant, axis=1)
+    # Assegna quadrante: indice a 2 bit (competitivo, spesa alta) nelle 4 etichette
+    competitive = supplier_metrics['price_competitiveness'].to_numpy() >= 0.5
+    high_spending = supplier_metrics['spending_normalized'].to_numpy() >= 0.5
+    quadrant_labels = np.array(['Rationalize/Exit', 'Critical Negotiations', 'Leverage Opportunities', 'Strategic Partners'])
+    supplier_metrics['quadrant'] = quadrant_labels[competitive.astype(np.uint8) * 2 + high_spending.astype(np.uint8)]
     supplier_metrics.reset_index(inplace=True)
     supplier_metrics.rename(columns={'supplier_display_name': 'supplier_name'}, inplace=True)
     
@@ -184,22 +181,14 @@ else:
     positioning_df['performance_score'] = (positioning_df['price_competitiveness'] * 100).round(1)
     positioning_df['total_contracts'] = positioning_df['contracts_count']
     
-    # Definisci i colori per i quadranti strategici
-    def get_strategic_color(row):
-        spend_normalized = row['total_spend_normalized']
-        performance = row['performance_score']
-        
-        if spend_normalized >= 50 and performance >= 50:
-            return 'Strategic Partners'
-        elif spend_normalized >= 50 and performance < 50:
-            return 'Critical Negotiations'
-        elif spend_normalized < 50 and performance >= 50:
-            return 'Leverage Opportunities'
-        else:
-            return 'Rationalize/Exit'
-    
-    positioning_df['strategic_category'] = positioning_df.apply(get_strategic_color, axis=1)
+    # Categoria strategica (colori dei quadranti) = quadrante: stesse soglie su scala 0-100
+    positioning_df['strategic_category'] = positioning_df['quadrant']
     
+    return positioning_df
+
+@st.cache_data(show_spinner=False)
+def build_strategic_matrix(positioning_df):
+    """Build the strategic positioning scatter, cached as Plotly JSON per positioning table"""
     # Scatter plot della matrice strategica
     fig_strategic = px.scatter(
         positioning_df,
@@ -225,7 +214,7 @@ else:
         },
         size_max=15  # DIMENSIONE MASSIMA RIDOTTA
     )
-    
+
     # REGOLA DIMENSIONE DELLE BOLLE E HOVER PERSONALIZZATO
     fig_strategic.update_traces(
         marker=dict(
@@ -243,7 +232,7 @@ else:
             "<extra></extra>"
         )
     )
-    
+
     # PERSONALIZZA IL COLORE DEL BOX HOVER PER OGNI QUADRANTE
     for trace in fig_strategic.data:
         if hasattr(trace, 'name') and trace.name in STRATEGIC_COLORS:
@@ -254,11 +243,11 @@ else:
                     font=dict(color="white", size=12)
                 )
             )
-    
+
     # Aggiungi linee di demarcazione dei quadranti
     fig_strategic.add_hline(y=50, line_dash="dash", line_color="gray", opacity=0.5)
     fig_strategic.add_vline(x=50, line_dash="dash", line_color="gray", opacity=0.5)
-    
+
     # Aggiungi annotazioni dei quadranti
     def hex_to_rgba(hex_color: str, alpha: float = 1.0) -> str:
         hex_color = hex_color.lstrip('#')
@@ -292,7 +281,7 @@ else:
         showarrow=False, font_size=12, font_color="white",
         bgcolor=hex_to_rgba(STRATEGIC_COLORS['Rationalize/Exit'], ALPHA)
     )
-    
+
     # LAYOUT CORRETTO - LEGENDA SOTTO E ALLINEATA A SINISTRA
     fig_strategic.update_layout(
         height=600,
@@ -305,6 +294,18 @@ else:
         ),
         margin=dict(b=80)  # Margine inferiore per la legenda
     )
+
+    return fig_strategic.to_json()
+
+
+# Calcola metriche con filtri - VERSIONE CORRETTA
+positioning_df = compute_positioning(analyzer, selected_l1, selected_l2, selected_l3)
+
+if positioning_df.empty:
+    st.warning("📊 No data available for the selected filters. Try adjusting your selection.")
+else:
+    # Figura della matrice strategica (JSON in cache, niente pipeline px ad ogni rerun)
+    fig_strategic = pio.from_json(build_strategic_matrix(positioning_df))
     
     st.plotly_chart(fig_strategic, use_container_width=True)
     
@@ -314,7 +315,14 @@ else:
     # Statistiche per quadrante strategico
     col_quad1, col_quad2, col_quad3, col_quad4 = st.columns(4)
     
-    quadrant_stats = positioning_df.groupby('strategic_category').agg({
+    # Quadrante come categoria ordinata: un solo ordinamento (quadrante, performance)
+    # condiviso da statistiche per quadrante e tabella summary
+    quadrant_order = ['Strategic Partners', 'Leverage Opportunities', 'Critical Negotiations', 'Rationalize/Exit']
+    ranked_df = positioning_df.assign(
+        strategic_category=pd.Categorical(positioning_df['strategic_category'], categories=quadrant_order, ordered=True)
+    ).sort_values(['strategic_category', 'performance_score'], ascending=[True, False])
+    
+    quadrant_stats = ranked_df.groupby('strategic_category', observed=True).agg({
         'supplier_name': 'count',
         'total_spending': 'sum',
         'performance_score': 'mean'
@@ -372,9 +380,9 @@ else:
     st.markdown("### 📊 Complete Supplier Matrix Summary")
     
     # Crea tabella completa
-    summary_df = positioning_df[['supplier_name', 'strategic_category', 'performance_score', 
-                                'total_spend_normalized', 'total_spending', 'avg_total_price', 
-                                'contracts_count', 'items_count']].copy()
+    summary_df = ranked_df[['supplier_name', 'strategic_category', 'performance_score', 
+                           'total_spend_normalized', 'total_spending', 'avg_total_price', 
+                           'contracts_count', 'items_count']].copy()
     
     # Rinomina colonne
     summary_df.columns = [
@@ -384,25 +392,20 @@ else:
     ]
     
     # Formatta valori
-    summary_df['Total Spending (€)'] = summary_df['Total Spending (€)'].apply(lambda x: f"€{x:,.0f}")
-    summary_df['Avg Unit Price (€)'] = summary_df['Avg Unit Price (€)'].apply(lambda x: f"€{x:,.2f}")
-    summary_df['Price Competitiveness (%)'] = summary_df['Price Competitiveness (%)'].apply(lambda x: f"{x:.1f}%")
-    summary_df['Spend Impact (%)'] = summary_df['Spend Impact (%)'].apply(lambda x: f"{x:.1f}%")
-    
-    # Ordina per quadrante e performance
-    quadrant_order = ['Strategic Partners', 'Leverage Opportunities', 'Critical Negotiations', 'Rationalize/Exit']
-    summary_df['quadrant_order'] = summary_df['Strategic Quadrant'].map({q: i for i, q in enumerate(quadrant_order)})
-    summary_df = summary_df.sort_values(['quadrant_order', 'Price Competitiveness (%)'], ascending=[True, False])
-    summary_df = summary_df.drop('quadrant_order', axis=1)
+    summary_df['Total Spending (€)'] = format_series(summary_df['Total Spending (€)'], '€{:,.0f}', '€0')
+    summary_df['Avg Unit Price (€)'] = format_series(summary_df['Avg Unit Price (€)'], '€{:,.2f}', '€0')
+    summary_df['Price Competitiveness (%)'] = format_series(summary_df['Price Competitiveness (%)'], '{:.1f}%', '0.0%')
+    summary_df['Spend Impact (%)'] = format_series(summary_df['Spend Impact (%)'], '{:.1f}%', '0.0%')
     
-    # Funzione per colorare le righe in base al quadrante
-    def highlight_quadrant(row):
-        color = STRATEGIC_COLORS.get(row['Strategic Quadrant'], '')
-        return [f'background-color: {color}20'] * len(row)  # Aggiunge trasparenza (20 in hex ≈ 12% opacity)
+    # Colori delle righe in base al quadrante: uno stile CSS per quadrante, mappato
+    # su tutte le righe in un colpo (20 in hex ≈ 12% opacity)
+    quadrant_css = {quadrant: f'background-color: {color}20' for quadrant, color in STRATEGIC_COLORS.items()}
+    row_css = summary_df['Strategic Quadrant'].astype(object).map(quadrant_css).fillna('background-color: 20')
+    table_css = pd.DataFrame({column: row_css for column in summary_df.columns})
     
     # Mostra tabella completa con colori
     st.dataframe(
-        summary_df.style.apply(highlight_quadrant, axis=1),
+        summary_df.style.apply(lambda _: table_css, axis=None),
         use_container_width=True,
         hide_index=True,
         column_config={
@@ -17,6 +17,7 @@ from dashboard_utils import (
     SIZE_COLORS,
     ENGAGEMENT_COLORS,
     get_category_options,
+    cached_top_suppliers,
     configure_streamlit_page,
     format_currency,
     format_percentage
@@ -164,7 +165,8 @@ if category_desc:
 # ============================================================================
 
 # Get top suppliers with complete profile
-top_suppliers = analyzer.get_top_suppliers_by_category(
+top_suppliers = cached_top_suppliers(
+    analyzer,
     l1=selected_l1 if selected_l1 != "All" else None,
     l2=selected_l2 if selected_l2 != "All" else None,
     l3=selected_l3 if selected_l3 != "All" else None,
@@ -175,8 +177,8 @@ top_suppliers = analyzer.get_top_suppliers_by_category(
 
 if not top_suppliers.empty:
     
-    # Display suppliers with clean card style
-    for i, (_, supplier) in enumerate(top_suppliers.iterrows(), 1):
+    # Display suppliers with clean card style (plain dict records: no per-row Series via iterrows)
+    for i, supplier in enumerate(top_suppliers.to_dict('records'), 1):
         
         # Container for each supplier card
         with st.container():
@@ -1,14 +1,17 @@
 import streamlit as st
 import pandas as pd
+import numpy as np
 import plotly.express as px
 import plotly.graph_objects as go
+import plotly.io as pio
 from datetime import datetime, timedelta
 from pathlib import Path
 import json
 import time
-from dashboard_utils import get_analyzer
+from io import BytesIO
+from dashboard_utils import get_analyzer, configure_streamlit_page, load_data as load_tables, lttb_indices, format_series
 
-st.set_page_config(page_title="Business Intelligence", page_icon="🧠", layout="wide")
+configure_streamlit_page(page_title="Business Intelligence", page_icon="🧠", layout="wide")
 
 # Configurazioni colori
 ITEM_TYPE_COLORS = {
@@ -30,45 +33,160 @@ DOMAIN_COLORS = {
     'telecomunicazioni': '#f39c12'
 }
 
+# Punti massimi per i grafici di trend (oltre il doppio si applica LTTB)
+TREND_MAX_POINTS = 500
+
+# Righe per pagina della tabella contratti
+CONTRACTS_PAGE_SIZE = 50
+
 # Directory base
 BASE_DIR = Path(__file__).parent.parent
-DATA_DIR = BASE_DIR / 'data'
 
-# Caricamento dati
-@st.cache_data
+def sorted_categorical(values):
+    # Categorie solo osservate e in ordine alfabetico: le opzioni dei filtri sono cat.categories
+    values = values.astype('category').cat.remove_unused_categories()
+    return values.cat.reorder_categories(sorted(values.cat.categories))
+
+# Importi in tabella: "€1,234.56", "N/A" per i mancanti
+EURO_FORMAT = '€{:,.2f}'
+
+def format_badge(values, emoji_map):
+    # "<emoji> <valore>" calcolato sulle sole categorie (colonne category), "N/A" per i mancanti
+    badges = values.cat.rename_categories(lambda x: f"{emoji_map.get(x, '')} {x}")
+    return badges.astype(object).where(values.notna(), 'N/A')
+
+# Caricamento dati: risorsa condivisa restituita per riferimento (niente serializzazione
+# dei frame ad ogni rerun), quindi i frame vanno trattati in sola lettura
+@st.cache_resource
 def load_data():
-    contracts = pd.read_csv(DATA_DIR / 'contracts.csv')
-    items = pd.read_csv(DATA_DIR / 'items.csv')
-    suppliers = pd.read_csv(DATA_DIR / 'suppliers.csv')
+    # Tabelle condivise lette dalla copia Parquet (schema tipizzato, niente parsing CSV);
+    # sono risorse condivise in sola lettura, quindi si lavora su copie
+    items, suppliers, contracts = load_tables()
+    contracts = contracts.copy()
+    items = items.copy()
+    suppliers = suppliers.copy()
     
-    # Conversione date per contratti
-    contracts['start_date'] = pd.to_datetime(contracts['start_date'], errors='coerce', utc=True)
-    contracts['end_date'] = pd.to_datetime(contracts['end_date'], errors='coerce', utc=True)
-    contracts['start_date'] = contracts['start_date'].dt.tz_localize(None)
-    contracts['end_date'] = contracts['end_date'].dt.tz_localize(None)
+    # Conversione date per contratti: formato ISO 8601 dichiarato (niente inferenza dal primo
+    # valore), offset misti normalizzati in UTC e poi resi naive
+    for col in ['start_date', 'end_date']:
+        contracts[col] = pd.to_datetime(contracts[col], errors='coerce', utc=True, format='ISO8601').dt.tz_localize(None)
     
     # Calcolo status
     today = pd.Timestamp.now().tz_localize(None)
-    contracts['status'] = contracts['end_date'].apply(
-        lambda x: 'Scaduto' if pd.notna(x) and x < today 
-        else 'In scadenza' if pd.notna(x) and x < today + timedelta(days=90)
-        else 'Attivo'
+    end_date = contracts['end_date']
+    contracts['status'] = np.select(
+        [end_date < today, end_date < today + timedelta(days=90)],  # NaT compara sempre False
+        ['Scaduto', 'In scadenza'],
+        default='Attivo'
     )
     
+    # Nome canonico del fornitore per contratto: mappa display_name/supplier_name -> canonical_name
+    # (a parità di chiave vince la prima riga, display_name prima di supplier_name), fallback sul nome
+    name_pairs = pd.DataFrame({
+        'name': np.column_stack([suppliers['display_name'], suppliers['supplier_name']]).ravel(),
+        'canonical_name': np.repeat(suppliers['canonical_name'].to_numpy(), 2)
+    }).dropna(subset=['name']).drop_duplicates('name')
+    supplier_mapping = pd.Series(name_pairs['canonical_name'].to_numpy(), index=name_pairs['name'])
+    contracts['canonical_name'] = contracts['supplier'].map(supplier_mapping).fillna(contracts['supplier'])
+    
+    # Numero contratto come testo (stringhe Arrow) per la ricerca per sottostringa
+    contracts['contract_id_str'] = contracts['contract_id'].astype('string[pyarrow]')
+    
+    # Testo per la ricerca full-text: oggetto, termini di pagamento e penali in minuscolo,
+    # concatenati con un separatore che l'utente non digita (una sola scansione per ricerca).
+    # Anche questo in stringhe Arrow: contains gira nei kernel colonnari di PyArrow
+    contracts['search_blob'] = (
+        contracts['contract_subject'].fillna('') + '\x1f' +
+        contracts['payment_terms'].fillna('') + '\x1f' +
+        contracts['penalties'].fillna('')
+    ).str.lower().astype('string[pyarrow]')
+    
+    # Colonne usate solo come chiavi di filtro/raggruppamento: dtype category
+    contracts['status'] = pd.Categorical(contracts['status'], categories=['Attivo', 'In scadenza', 'Scaduto'])
+    contracts['contract_domain'] = sorted_categorical(contracts['contract_domain'])
+    contracts['canonical_name'] = sorted_categorical(contracts['canonical_name'])
+    contracts['supplier'] = sorted_categorical(contracts['supplier'])
+    for col in ['item_type', 'class_l1', 'class_l2', 'class_l3', 'class_confidence_level', 'classification_label']:
+        items[col] = sorted_categorical(items[col])
+    
+    # Descrizioni items in stringhe Arrow (tipizzate, niente oggetti Python per cella)
+    items['item_description'] = items['item_description'].astype('string[pyarrow]')
+    
+    # Contatori e versioni: interi al tipo più piccolo che li contiene
+    for col in ['version', 'number_of_items', 'hw_items', 'sw_items', 'service_items']:
+        contracts[col] = pd.to_numeric(contracts[col], downcast='integer')
+    items['duration_years'] = pd.to_numeric(items['duration_years'], downcast='integer')
+    suppliers['specialization'] = sorted_categorical(suppliers['specialization'])
+    
     return contracts, items, suppliers
 
+@st.cache_resource
+def load_latest_contracts():
+    # Ultima versione di ogni contratto, calcolata una volta e ordinata per contract_id
+    # (stesso ordine del groupby usato prima ad ogni rerun); sola lettura come load_data
+    contracts, _, _ = load_data()
+    is_latest = contracts['version'] == contracts.groupby('contract_id')['version'].transform('max')
+    return contracts[is_latest].sort_values('contract_id', kind='stable')
+
+@st.cache_resource
+def load_contract_versions():
+    # Versioni di ogni contratto (dalla più recente) indicizzate per contract_id, calcolate
+    # una volta: il dettaglio contratto è un lookup invece di filtro + ordinamento ad ogni rerun
+    contracts, _, _ = load_data()
+    versions = contracts.sort_values('version', ascending=False, kind='stable')
+    positions = versions.groupby('contract_id', sort=False).indices
+    return {contract_id: versions.iloc[rows] for contract_id, rows in positions.items()}
+
+@st.cache_resource
+def load_class_options():
+    # Opzioni di classe L1/L2/L3 e posizione di ogni valore, calcolate una volta:
+    # il form di validazione trova l'indice di default con un lookup
+    _, items, _ = load_data()
+    class_options = {}
+    for level in ['class_l1', 'class_l2', 'class_l3']:
+        options = items[level].cat.categories.tolist()
+        class_options[level] = (options, {value: idx for idx, value in enumerate(options)})
+    return class_options
+
+@st.cache_resource
+def load_items_by_contract():
+    # Indice numero contratto (come testo) -> posizioni degli items, calcolato una volta:
+    # la ricerca degli items di un contratto diventa un lookup invece di scansioni complete
+    _, items, _ = load_data()
+    contract_numbers = items['contract_number'].astype(str).where(items['contract_number'].notna())
+    return contract_numbers.groupby(contract_numbers, sort=False).indices
+
+@st.cache_resource
+def load_item_search_text():
+    # Descrizioni items in minuscolo (stringhe Arrow), allineate per posizione a items_df:
+    # la ricerca non rifà lower ad ogni filtro e la colonna non finisce negli export
+    _, items, _ = load_data()
+    return items['item_description'].str.lower().astype('string[pyarrow]')
+
 contracts_df, items_df, suppliers_df = load_data()
+latest_contracts_df = load_latest_contracts()
 
 # Caricamento validazioni per items
 VALIDATION_FILE = BASE_DIR / 'validated_items.json'
 
-def load_validations():
+def validations_mtime():
+    # Data di modifica del file validazioni (0 se assente): chiave delle cache che ne dipendono
+    return VALIDATION_FILE.stat().st_mtime_ns if VALIDATION_FILE.exists() else 0
+
+@st.cache_data(show_spinner=False, max_entries=1)
+def read_validations(validations_mtime):
+    # Il file viene riletto e riparsato solo quando cambia la data di modifica
+    # (cache_data restituisce una copia: il chiamante può modificare il dizionario)
     if VALIDATION_FILE.exists():
         with open(VALIDATION_FILE, 'r') as f:
             return json.load(f)
     return {}
 
+def load_validations():
+    return read_validations(validations_mtime())
+
 def save_validation(item_id, validation_data):
+    # Validazioni correnti dalla cache (solo uno stat del file), una sola scrittura
     validations = load_validations()
     validations[str(item_id)] = validation_data
     with open(VALIDATION_FILE, 'w') as f:
@@ -76,81 +194,245 @@ def save_validation(item_id, validation_data):
 
 validations = load_validations()
 
-# Calcolo statistiche fornitori
-@st.cache_data
-def calculate_supplier_stats(suppliers_df, contracts_df):
-    stats = []
+@st.cache_resource(max_entries=1)
+def load_validated_items(validations_mtime):
+    # Items con la colonna 'validated', ricalcolati solo quando il file delle validazioni cambia;
+    # risorsa condivisa in sola lettura: i filtri selezionano righe senza copiare il frame
+    validations = load_validations()
+    items = items_df.copy()
+    # Una sola passata vettoriale sugli id (le chiavi delle validazioni sono gli item_id come testo)
+    items['validated'] = items['item_id'].astype(str).isin(list(validations))
+    return items
+
+# Export Excel in streaming: con constant_memory xlsxwriter scrive su disco ogni riga
+# appena completata, quindi le celle vanno scritte in ordine di riga (to_excel di pandas
+# scrive per colonne e con questa opzione perderebbe i dati)
+# (strings_to_urls disattivato: il testo resta testo, senza il controllo URL su ogni cella)
+EXCEL_WRITER_OPTIONS = {'constant_memory': True, 'strings_to_urls': False, 'default_date_format': 'yyyy-mm-dd hh:mm:ss'}
+
+def write_excel_sheet(writer, df, sheet_name, index=True):
+    if index:
+        df = df.rename_axis(df.index.name or '').reset_index()
     
-    for idx, supplier in suppliers_df.iterrows():
-        supplier_id_num = str(supplier['id']).replace('supplier_', '')
-        
-        supplier_contracts = contracts_df[contracts_df['supplier_id'].astype(str) == supplier_id_num]
-        
-        if len(supplier_contracts) == 0:
-            supplier_contracts = contracts_df[contracts_df['supplier'] == supplier['display_name']]
-        
-        if len(supplier_contracts) == 0:
-            supplier_contracts = contracts_df[contracts_df['supplier'] == supplier['canonical_name']]
-        
-        if len(supplier_contracts) == 0:
-            supplier_contracts = contracts_df[contracts_df['supplier'] == supplier['supplier_name']]
+    worksheet = writer.book.add_worksheet(sheet_name)
+    header_format = writer.book.add_format({'bold': True, 'border': 1, 'align': 'center', 'valign': 'top'})
+    worksheet.write_row(0, 0, [str(col) for col in df.columns], header_format)
+    
+    # Valori mancanti come celle vuote (None viene saltato da xlsxwriter)
+    values = df.astype(object).where(df.notna(), None)
+    for row_idx, row in enumerate(values.itertuples(index=False, name=None), start=1):
+        worksheet.write_row(row_idx, 0, row)
+
+# File Excel degli export in cache: ripetere il download con gli stessi dati
+# restituisce i byte già generati invece di riscrivere il workbook
+@st.cache_data(show_spinner=False)
+def build_items_xlsx(filtered_items, validations):
+    output = BytesIO()
+    
+    with pd.ExcelWriter(output, engine='xlsxwriter', engine_kwargs={'options': EXCEL_WRITER_OPTIONS}) as writer:
+        write_excel_sheet(writer, filtered_items, 'Items', index=False)
         
-        total_value = supplier_contracts['total_amount'].sum()
-        n_contracts = len(supplier_contracts)
+        if len(validations) > 0:
+            val_df = pd.DataFrame.from_dict(validations, orient='index')
+            write_excel_sheet(writer, val_df, 'Validazioni')
+    
+    return output.getvalue()
+
+@st.cache_data(show_spinner=False)
+def build_items_parquet(filtered_items):
+    # Alternativa colonnare all'Excel: scrittura PyArrow compressa, molto più rapida per export grandi
+    output = BytesIO()
+    filtered_items.to_parquet(output, engine='pyarrow', compression='zstd', index=False)
+    return output.getvalue()
+
+@st.cache_data(show_spinner=False)
+def build_suppliers_xlsx(_supplier_stats, _suppliers_df, _contracts_df):
+    # Dati statici per processo: nessun argomento da hashare
+    output = BytesIO()
+    
+    with pd.ExcelWriter(output, engine='xlsxwriter', engine_kwargs={'options': EXCEL_WRITER_OPTIONS}) as writer:
+        export_data = _supplier_stats.merge(
+            _suppliers_df[['id', 'address', 'known_technologies', 'typical_categories']],
+            on='id',
+            how='left'
+        )
+        write_excel_sheet(writer, export_data, 'Fornitori', index=False)
         
-        stats.append({
-            'id': supplier['id'],
-            'supplier_slug': supplier['supplier_slug'],
-            'supplier_name': supplier['supplier_name'],
-            'canonical_name': supplier['canonical_name'],
-            'display_name': supplier['display_name'],
-            'specialization': supplier['specialization'],
-            'address': supplier['address'],
-            'total_value': total_value,
-            'n_contracts': n_contracts
-        })
-    
-    return pd.DataFrame(stats)
+        contracts_export = _contracts_df[['contract_id', 'supplier', 'contract_subject', 
+                                          'start_date', 'end_date', 'total_amount']]
+        write_excel_sheet(writer, contracts_export, 'Contratti per Fornitore', index=False)
+    
+    return output.getvalue()
+
+# Calcolo statistiche fornitori (i frame condivisi non vengono hashati ad ogni rerun)
+@st.cache_data
+def calculate_supplier_stats(_suppliers_df, _contracts_df):
+    # Aggregati per chiave calcolati una sola volta (invece di una scansione dei
+    # contratti per ogni fornitore): valore totale e numero contratti
+    by_supplier_id = _contracts_df.groupby(
+        _contracts_df['supplier_id'].astype(str), sort=False
+    )['total_amount'].agg(['sum', 'size'])
+    by_supplier_name = _contracts_df.groupby('supplier', observed=True, sort=False)['total_amount'].agg(['sum', 'size'])
+    
+    # Match per id numerico, poi fallback su display_name, canonical_name e supplier_name
+    supplier_ids = _suppliers_df['id'].astype(str).str.replace('supplier_', '', regex=False)
+    n_contracts = supplier_ids.map(by_supplier_id['size']).fillna(0)
+    total_value = supplier_ids.map(by_supplier_id['sum']).fillna(0.0)
+    
+    for name_column in ['display_name', 'canonical_name', 'supplier_name']:
+        missing = n_contracts == 0
+        if not missing.any():
+            break
+        names = _suppliers_df.loc[missing, name_column]
+        n_contracts[missing] = names.map(by_supplier_name['size']).fillna(0)
+        total_value[missing] = names.map(by_supplier_name['sum']).fillna(0.0)
+    
+    stats = _suppliers_df[['id', 'supplier_slug', 'supplier_name', 'canonical_name',
+                           'display_name', 'specialization', 'address']].copy()
+    stats['total_value'] = total_value.where(n_contracts > 0, 0.0)
+    stats['n_contracts'] = n_contracts.astype(int)
+    
+    return stats.reset_index(drop=True)
+
+# KPI della tab fornitori calcolati una volta: supplier_stats è statico per processo
+@st.cache_data
+def summarize_suppliers(_supplier_stats):
+    if len(_supplier_stats) == 0:
+        return {'top_supplier': None, 'total_value': 0.0, 'avg_contracts': float('nan')}
+    return {
+        'top_supplier': _supplier_stats.at[_supplier_stats['total_value'].idxmax(), 'display_name'],
+        'total_value': _supplier_stats['total_value'].sum(),
+        'avg_contracts': _supplier_stats['n_contracts'].mean()
+    }
 
 def get_contract_items(contract_id, items_df):
     """
     Trova gli items associati a un contratto usando diverse strategie di matching
     """
+    # Posizioni degli items per numero contratto (indice precalcolato, niente scansioni)
+    items_by_contract = load_items_by_contract()
+    contract_id = str(contract_id)
     
-    # Strategia 1: Match diretto con contract_id completo
-    contract_items = items_df[items_df['contract_number'].astype(str) == str(contract_id)]
-    
-    if len(contract_items) == 0:
-        # Strategia 2: Match con le ultime cifre del contract_id
-        try:
-            # Prova con le ultime 2 cifre
-            last_2_digits = str(contract_id)[-2:]
-            contract_items = items_df[items_df['contract_number'].astype(str) == last_2_digits]
-        except:
-            pass
+    def items_at(contract_numbers):
+        positions = [items_by_contract[number] for number in contract_numbers]
+        if not positions:
+            return items_df.iloc[:0]
+        return items_df.iloc[np.sort(np.concatenate(positions))]
     
-    if len(contract_items) == 0:
-        # Strategia 3: Match con le ultime 3 cifre
-        try:
-            last_3_digits = str(contract_id)[-3:]
-            contract_items = items_df[items_df['contract_number'].astype(str) == last_3_digits]
-        except:
-            pass
+    # Strategia 1: Match diretto con contract_id completo
+    # Strategia 2: Match con le ultime 2 cifre del contract_id
+    # Strategia 3: Match con le ultime 3 cifre
+    for key in [contract_id, contract_id[-2:], contract_id[-3:]]:
+        if key in items_by_contract:
+            return items_at([key])
     
-    if len(contract_items) == 0:
-        # Strategia 4: Match parziale (contract_id contiene contract_number)
-        contract_items = items_df[items_df['contract_number'].apply(
-            lambda x: str(x) in str(contract_id) if pd.notna(x) else False
-        )]
+    # Strategia 4: Match parziale (contract_id contiene contract_number)
+    contract_items = items_at([number for number in items_by_contract if number in contract_id])
     
     if len(contract_items) == 0:
         # Strategia 5: Match inverso (contract_number contiene parte di contract_id)
-        contract_items = items_df[items_df['contract_number'].apply(
-            lambda x: str(contract_id)[-4:] in str(x) if pd.notna(x) else False
-        )]
+        contract_items = items_at([number for number in items_by_contract if contract_id[-4:] in number])
     
     return contract_items
 
+# Statistiche degli items di un contratto (conteggi per tipo e valore totale), in cache
+# per contract_id: dipendono solo dal contratto, non dagli altri widget
+@st.cache_data(show_spinner=False)
+def summarize_contract_items(contract_id):
+    contract_items = get_contract_items(contract_id, items_df)
+    item_type_counts = contract_items['item_type'].value_counts()
+    type_counts = {item_type: int(item_type_counts.get(item_type, 0)) for item_type in ['HARDWARE', 'SOFTWARE', 'SERVICE']}
+    return type_counts, contract_items['total_price'].sum()
+
+# Filtri items: posizioni delle righe selezionate e conteggi di qualità, in cache per
+# combinazione di filtri e versione del file validazioni (i rerun non rifanno le scansioni)
+@st.cache_data(show_spinner=False, max_entries=100)
+def filter_items(filter_key, validations_mtime):
+    type_filter, confidence_filter, l1_filter, validated_filter, search_item = filter_key
+    validated_items = load_validated_items(validations_mtime)
+    
+    # Un'unica maschera booleana e una sola selezione
+    items_mask = np.ones(len(validated_items), dtype=bool)
+    
+    if type_filter != 'Tutti':
+        items_mask &= (validated_items['item_type'] == type_filter).to_numpy()
+    
+    if confidence_filter != 'Tutti':
+        items_mask &= (validated_items['class_confidence_level'] == confidence_filter).to_numpy()
+    
+    if l1_filter != 'Tutti':
+        items_mask &= (validated_items['class_l1'] == l1_filter).to_numpy()
+    
+    if validated_filter == 'Validati':
+        items_mask &= validated_items['validated'].to_numpy()
+    elif validated_filter == 'Non Validati':
+        items_mask &= ~validated_items['validated'].to_numpy()
+    
+    if search_item:
+        # Sottostringa letterale come nella ricerca contratti: '(' o '*' non sono regex
+        search_text = load_item_search_text()
+        items_mask &= search_text.str.contains(search_item.lower(), regex=False, na=False).to_numpy(dtype=bool)
+    
+    # Conteggi come somme di maschere, senza materializzare i sottoinsiemi
+    items_counts = {
+        'low_conf': int((items_mask & (validated_items['class_confidence_level'] == 'LOW').to_numpy()).sum()),
+        'no_classification': int((items_mask & validated_items['classification_label'].isna().to_numpy()).sum()),
+        'validated': int((items_mask & validated_items['validated'].to_numpy()).sum())
+    }
+    return np.flatnonzero(items_mask), items_counts
+
+# Campi JSON testuali (terminology_mapping, name_variants): parsing in cache per stringa,
+# i rerun dello stesso contratto/fornitore non rileggono il JSON
+@st.cache_data(show_spinner=False)
+def parse_json_field(raw):
+    return json.loads(raw)
+
+# Grafici fornitori: JSON Plotly in cache per dati aggregati, senza pipeline px ad ogni rerun
+@st.cache_data(show_spinner=False)
+def build_top_value_chart(top_10_value):
+    fig_top_value = px.bar(
+        top_10_value,
+        x='total_value',
+        y='display_name',
+        orientation='h',
+        labels={'total_value': 'Valore Totale (€)', 'display_name': ''},
+        color='total_value',
+        color_continuous_scale='Blues'
+    )
+    fig_top_value.update_layout(yaxis={'categoryorder': 'total ascending'})
+    return fig_top_value.to_json()
+
+@st.cache_data(show_spinner=False)
+def build_specialization_pie(spec_dist):
+    fig_spec = px.pie(
+        values=spec_dist.values,
+        names=spec_dist.index,
+        color_discrete_sequence=px.colors.qualitative.Set3
+    )
+    return fig_spec.to_json()
+
+@st.cache_data(show_spinner=False)
+def build_trend_chart(trend_monthly):
+    fig_trend = px.line(
+        trend_monthly,
+        x='year_month',
+        y='total_amount',
+        markers=True,
+        labels={'year_month': 'Periodo', 'total_amount': 'Valore (€)'}
+    )
+    return fig_trend.to_json()
+
+@st.cache_data(show_spinner=False)
+def build_versions_chart(versions_chart):
+    fig_versions = px.line(
+        versions_chart,
+        x='version',
+        y='total_amount',
+        markers=True,
+        labels={'version': 'Versione', 'total_amount': 'Valore (€)'}
+    )
+    return fig_versions.to_json()
+
 supplier_stats = calculate_supplier_stats(suppliers_df, contracts_df)
 
 # Header
@@ -174,21 +456,12 @@ with tab_contracts:
         search_contract = st.text_input("🔢 Numero Contratto", placeholder="Es: 7010148320", key="contract_search")
 
     with col_f2:
-        # Create supplier mapping avoiding duplicate keys
-        supplier_mapping = {}
-        for _, row in suppliers_df.iterrows():
-            if pd.notna(row['display_name']) and row['display_name'] not in supplier_mapping:
-                supplier_mapping[row['display_name']] = row['canonical_name']
-            if pd.notna(row['supplier_name']) and row['supplier_name'] not in supplier_mapping:
-                supplier_mapping[row['supplier_name']] = row['canonical_name']
-        
-        contracts_df['canonical_name'] = contracts_df['supplier'].map(supplier_mapping).fillna(contracts_df['supplier'])
-        
-        canonical_names = ['Tutti'] + sorted(contracts_df['canonical_name'].dropna().unique().tolist())
+        # canonical_name calcolato una volta in load_data
+        canonical_names = ['Tutti'] + contracts_df['canonical_name'].cat.categories.tolist()
         selected_canonical = st.selectbox("🏢 Fornitore (Canonical)", canonical_names, key="contract_supplier")
 
     with col_f3:
-        domains_list = ['Tutti'] + sorted(contracts_df['contract_domain'].dropna().unique().tolist())
+        domains_list = ['Tutti'] + contracts_df['contract_domain'].cat.categories.tolist()
         selected_domain = st.selectbox("🏷️ Dominio", domains_list, key="contract_domain")
 
     with col_f4:
@@ -200,42 +473,55 @@ with tab_contracts:
 
     search_text = st.text_input("🔎 Ricerca full-text", placeholder="Cerca in oggetto, termini, clausole...", key="contract_fulltext")
 
-    # Applicazione filtri contratti
-    filtered_df = contracts_df.copy()
+    # Applicazione filtri contratti: un'unica maschera booleana e una sola selezione, senza copie.
+    # Base: tutte le versioni oppure solo l'ultima di ogni contratto (precalcolata)
+    base_df = contracts_df if show_all_versions else latest_contracts_df
+    contracts_mask = np.ones(len(base_df), dtype=bool)
 
     if search_contract:
-        filtered_df = filtered_df[filtered_df['contract_id'].astype(str).str.contains(search_contract, na=False)]
+        contracts_mask &= base_df['contract_id_str'].str.contains(search_contract, na=False, regex=False).to_numpy(dtype=bool)
 
     if selected_canonical != 'Tutti':
-        filtered_df = filtered_df[filtered_df['canonical_name'] == selected_canonical]
+        contracts_mask &= (base_df['canonical_name'] == selected_canonical).to_numpy()
 
     if selected_domain != 'Tutti':
-        filtered_df = filtered_df[filtered_df['contract_domain'] == selected_domain]
+        contracts_mask &= (base_df['contract_domain'] == selected_domain).to_numpy()
 
     if selected_status != 'Tutti':
-        filtered_df = filtered_df[filtered_df['status'] == selected_status]
+        contracts_mask &= (base_df['status'] == selected_status).to_numpy()
 
     if search_text:
         search_text_lower = search_text.lower()
-        filtered_df = filtered_df[
-            filtered_df['contract_subject'].astype(str).str.lower().str.contains(search_text_lower, na=False) |
-            filtered_df['payment_terms'].astype(str).str.lower().str.contains(search_text_lower, na=False) |
-            filtered_df['penalties'].astype(str).str.lower().str.contains(search_text_lower, na=False)
-        ]
+        contracts_mask &= base_df['search_blob'].str.contains(search_text_lower, regex=False).to_numpy(dtype=bool)
 
-    if not show_all_versions:
-        filtered_df = filtered_df.sort_values('version', ascending=False).groupby('contract_id').first().reset_index()
+    filtered_df = base_df[contracts_mask]
 
     # Tabella contratti
     st.subheader(f"📋 Contratti ({len(filtered_df)} risultati)")
 
-    display_df = filtered_df.copy()
+    # Paginazione lato server: si formattano e si inviano al browser solo le righe della pagina
+    n_pages = max(1, -(-len(filtered_df) // CONTRACTS_PAGE_SIZE))
+    page_start = 0
+    if n_pages > 1:
+        col_page, col_page_info = st.columns([1, 4])
+        with col_page:
+            contracts_page = st.number_input("Pagina", min_value=1, value=1, step=1, key="contracts_page")
+        # La pagina salvata può superare il totale dopo un cambio di filtri
+        contracts_page = min(int(contracts_page), n_pages)
+        page_start = (contracts_page - 1) * CONTRACTS_PAGE_SIZE
+        with col_page_info:
+            st.caption(f"Pagina {contracts_page} di {n_pages} • righe {page_start + 1}-{min(page_start + CONTRACTS_PAGE_SIZE, len(filtered_df))}")
+
+    display_df = filtered_df.iloc[page_start:page_start + CONTRACTS_PAGE_SIZE].copy()
     display_df['start_date_fmt'] = display_df['start_date'].dt.strftime('%d/%m/%Y')
     display_df['end_date_fmt'] = display_df['end_date'].dt.strftime('%d/%m/%Y')
-    display_df['total_amount_fmt'] = display_df['total_amount'].apply(lambda x: f"€{x:,.2f}" if pd.notna(x) else "N/A")
+    display_df['total_amount_fmt'] = format_series(display_df['total_amount'], EURO_FORMAT, 'N/A')
 
     status_emoji = {'Attivo': '🟢', 'In scadenza': '🟡', 'Scaduto': '🔴'}
-    display_df['status_badge'] = display_df['status'].apply(lambda x: f"{status_emoji.get(x, '')} {x}")
+    # Badge calcolato sulle sole categorie dello status, non riga per riga
+    display_df['status_badge'] = display_df['status'].cat.rename_categories(
+        lambda x: f"{status_emoji.get(x, '')} {x}"
+    )
 
     columns_to_show = ['contract_id', 'version', 'supplier', 'contract_domain', 'contract_subject', 
                        'start_date_fmt', 'end_date_fmt', 'total_amount_fmt', 'number_of_items', 'status_badge']
@@ -263,16 +549,19 @@ with tab_contracts:
     # Dettaglio Contratto
     st.subheader("📄 Dettaglio Contratto")
 
-    contract_ids = filtered_df['contract_id'].unique().tolist()
+    # Fornitore della prima riga di ogni contratto, per etichettare le opzioni senza filtrare il frame
+    first_rows = filtered_df.drop_duplicates('contract_id')
+    contract_ids = first_rows['contract_id'].tolist()
+    supplier_by_id = dict(zip(contract_ids, first_rows['supplier']))
     if len(contract_ids) > 0:
         selected_contract_id = st.selectbox(
             "Seleziona un contratto da analizzare:",
             contract_ids,
-            format_func=lambda x: f"{x} - {filtered_df[filtered_df['contract_id']==x].iloc[0]['supplier']}",
+            format_func=lambda x: f"{x} - {supplier_by_id[x]}",
             key="contract_detail_select"
         )
         
-        contract_versions = contracts_df[contracts_df['contract_id'] == selected_contract_id].sort_values('version', ascending=False)
+        contract_versions = load_contract_versions()[selected_contract_id]
         
         col_ver1, col_ver2 = st.columns([3, 1])
         
@@ -282,17 +571,18 @@ with tab_contracts:
         
         with col_ver2:
             versions_list = contract_versions['version'].tolist()
+            latest_version = versions_list[0]  # versioni ordinate dalla più recente
             selected_version = st.selectbox(
                 "Versione:",
                 versions_list,
-                format_func=lambda x: f"v{x}" + (" (latest)" if x == max(versions_list) else ""),
+                format_func=lambda x: f"v{x}" + (" (latest)" if x == latest_version else ""),
                 key="contract_version_select"
             )
         
-        if selected_version != max(versions_list):
+        if selected_version != latest_version:
             st.warning(f"⚠️ Stai visualizzando la versione {selected_version} (non corrente)")
         
-        selected_contract = contract_versions[contract_versions['version'] == selected_version].iloc[0]
+        selected_contract = contract_versions.iloc[versions_list.index(selected_version)]
         
         st.markdown("### 📋 Informazioni Generali")
         
@@ -337,7 +627,7 @@ with tab_contracts:
             st.markdown("#### 🏷️ Terminology Mapping")
             if pd.notna(selected_contract['terminology_mapping']):
                 try:
-                    terminology = json.loads(selected_contract['terminology_mapping'])
+                    terminology = parse_json_field(selected_contract['terminology_mapping'])
                     if terminology:
                         for key, value in terminology.items():
                             st.write(f"- **{key}:** {value}")
@@ -373,29 +663,26 @@ with tab_contracts:
             contract_items = get_contract_items(selected_contract['contract_id'], items_df)
             
             if len(contract_items) > 0:
-                # Statistiche Items
+                # Statistiche Items (in cache per contratto)
                 col_stat1, col_stat2, col_stat3, col_stat4 = st.columns(4)
+                item_type_counts, total_value_items = summarize_contract_items(selected_contract['contract_id'])
                 
                 with col_stat1:
-                    hw_count = len(contract_items[contract_items['item_type'] == 'HARDWARE'])
-                    st.metric("🔵 Hardware", hw_count)
+                    st.metric("🔵 Hardware", item_type_counts['HARDWARE'])
                 
                 with col_stat2:
-                    sw_count = len(contract_items[contract_items['item_type'] == 'SOFTWARE'])
-                    st.metric("🟣 Software", sw_count)
+                    st.metric("🟣 Software", item_type_counts['SOFTWARE'])
                 
                 with col_stat3:
-                    service_count = len(contract_items[contract_items['item_type'] == 'SERVICE'])
-                    st.metric("🟠 Service", service_count)
+                    st.metric("🟠 Service", item_type_counts['SERVICE'])
                 
                 with col_stat4:
-                    total_value_items = contract_items['total_price'].sum()
                     st.metric("💰 Valore Items", f"€{total_value_items:,.2f}")
                 
                 # Tabella Items
                 display_items = contract_items[['item_id', 'item_description', 'item_type', 'unit_price', 'quantity', 'total_price']].copy()
-                display_items['unit_price_fmt'] = display_items['unit_price'].apply(lambda x: f"€{x:,.2f}" if pd.notna(x) else "N/A")
-                display_items['total_price_fmt'] = display_items['total_price'].apply(lambda x: f"€{x:,.2f}" if pd.notna(x) else "N/A")
+                display_items['unit_price_fmt'] = format_series(display_items['unit_price'], EURO_FORMAT, 'N/A')
+                display_items['total_price_fmt'] = format_series(display_items['total_price'], EURO_FORMAT, 'N/A')
                 
                 st.dataframe(
                     display_items[['item_id', 'item_description', 'item_type', 'unit_price_fmt', 'quantity', 'total_price_fmt']],
@@ -420,8 +707,8 @@ with tab_contracts:
             versions_display = contract_versions[['version', 'start_date', 'end_date', 'total_amount']].copy()
             versions_display['start_date_fmt'] = versions_display['start_date'].dt.strftime('%d/%m/%Y')
             versions_display['end_date_fmt'] = versions_display['end_date'].dt.strftime('%d/%m/%Y') 
-            versions_display['total_amount_fmt'] = versions_display['total_amount'].apply(lambda x: f"€{x:,.2f}" if pd.notna(x) else "N/A")
-            versions_display['is_current'] = versions_display['version'] == max(versions_list)
+            versions_display['total_amount_fmt'] = format_series(versions_display['total_amount'], EURO_FORMAT, 'N/A')
+            versions_display['is_current'] = versions_display['version'] == latest_version
             
             st.dataframe(
                 versions_display[['version', 'start_date_fmt', 'end_date_fmt', 'total_amount_fmt', 'is_current']],
@@ -439,14 +726,8 @@ with tab_contracts:
             
             if len(contract_versions) > 1:
                 st.markdown("##### 📈 Evoluzione del Valore")
-                versions_chart = contract_versions.sort_values('version')
-                fig_versions = px.line(
-                    versions_chart,
-                    x='version',
-                    y='total_amount',
-                    markers=True,
-                    labels={'version': 'Versione', 'total_amount': 'Valore (€)'}
-                )
+                versions_chart = contract_versions[['version', 'total_amount']].sort_values('version')
+                fig_versions = pio.from_json(build_versions_chart(versions_chart))
                 st.plotly_chart(fig_versions, use_container_width=True, key="contract_versions_chart")
 
 # ==================== TAB ITEMS ====================
@@ -465,7 +746,7 @@ with tab_items:
         confidence_filter = st.selectbox("📊 Confidence Level", ['Tutti', 'HIGH', 'MEDIUM', 'LOW'], key="items_confidence")
 
     with col_i3:
-        l1_options = ['Tutti'] + sorted(items_df['class_l1'].dropna().unique().tolist())
+        l1_options = ['Tutti'] + items_df['class_l1'].cat.categories.tolist()
         l1_filter = st.selectbox("🎯 Classe L1", l1_options, key="items_l1")
 
     with col_i4:
@@ -473,55 +754,38 @@ with tab_items:
 
     search_item = st.text_input("🔎 Cerca Item", placeholder="Cerca nella descrizione...", key="items_search")
 
-    # Applicazione filtri items
-    filtered_items = items_df.copy()
-
-    # Aggiungi colonna validated
-    filtered_items['validated'] = filtered_items['item_id'].apply(lambda x: str(x) in validations)
-
-    if type_filter != 'Tutti':
-        filtered_items = filtered_items[filtered_items['item_type'] == type_filter]
-
-    if confidence_filter != 'Tutti':
-        filtered_items = filtered_items[filtered_items['class_confidence_level'] == confidence_filter]
-
-    if l1_filter != 'Tutti':
-        filtered_items = filtered_items[filtered_items['class_l1'] == l1_filter]
-
-    if validated_filter == 'Validati':
-        filtered_items = filtered_items[filtered_items['validated'] == True]
-    elif validated_filter == 'Non Validati':
-        filtered_items = filtered_items[filtered_items['validated'] == False]
-
-    if search_item:
-        filtered_items = filtered_items[
-            filtered_items['item_description'].astype(str).str.lower().str.contains(search_item.lower(), na=False)
-        ]
+    # Applicazione filtri items: posizioni e conteggi in cache per combinazione di filtri
+    # (colonna validated già calcolata per la versione corrente del file)
+    current_validations_mtime = validations_mtime()
+    validated_items = load_validated_items(current_validations_mtime)
+    items_filter_key = (type_filter, confidence_filter, l1_filter, validated_filter, search_item)
+    items_positions, items_counts = filter_items(items_filter_key, current_validations_mtime)
+    filtered_items = validated_items.iloc[items_positions]
 
     # Statistiche items
     st.subheader(f"📊 Statistiche Items ({len(filtered_items)} risultati)")
 
-    items_display = filtered_items.copy()
-
     col_q1, col_q2, col_q3 = st.columns(3)
 
     with col_q1:
-        low_conf_count = len(items_display[items_display['class_confidence_level'] == 'LOW'])
+        low_conf_count = items_counts['low_conf']
         st.metric("⚠️ Low Confidence", low_conf_count)
 
     with col_q2:
-        no_classification = len(items_display[items_display['classification_label'].isna()])
-        st.metric("❌ Senza Classificazione", no_classification)
+        st.metric("❌ Senza Classificazione", items_counts['no_classification'])
 
     with col_q3:
-        validated_count = len(items_display[items_display['validated'] == True])
-        st.metric("✅ Validati", validated_count)
+        st.metric("✅ Validati", items_counts['validated'])
 
     if low_conf_count > 0:
         with st.expander("📋 Items con Low Confidence da Validare"):
-            low_conf_items = items_display[items_display['class_confidence_level'] == 'LOW']
+            # Solo le colonne mostrate, selezionate insieme alle righe
+            low_conf_items = filtered_items.loc[
+                filtered_items['class_confidence_level'] == 'LOW',
+                ['item_description', 'classification_label', 'class_final_score', 'validated']
+            ]
             st.dataframe(
-                low_conf_items[['item_description', 'classification_label', 'class_final_score', 'validated']],
+                low_conf_items,
                 hide_index=True,
                 use_container_width=True,
                 key="items_low_conf_table"
@@ -534,24 +798,14 @@ with tab_items:
 
     st.markdown("##### 📋 Tabella Completa Items")
 
-    display_data = filtered_items.copy()
-
+    # Badge e prezzi formattati senza apply riga per riga, solo sulle colonne mostrate
     type_emoji = {'HARDWARE': '🔵', 'SOFTWARE': '🟣', 'SERVICE': '🟠'}
-    display_data['type_badge'] = display_data['item_type'].apply(
-        lambda x: f"{type_emoji.get(x, '')} {x}" if pd.notna(x) else "N/A"
-    )
-
     conf_emoji = {'HIGH': '🟢', 'MEDIUM': '🟡', 'LOW': '🔴'}
-    display_data['conf_badge'] = display_data['class_confidence_level'].apply(
-        lambda x: f"{conf_emoji.get(x, '')} {x}" if pd.notna(x) else "N/A"
-    )
-
-    display_data['validated_badge'] = display_data['validated'].apply(
-        lambda x: "✅ Si" if x else "⏳ No"
-    )
-
-    display_data['total_price_fmt'] = display_data['total_price'].apply(
-        lambda x: f"€{x:,.2f}" if pd.notna(x) else "N/A"
+    display_data = filtered_items[['item_id', 'item_description', 'classification_label']].assign(
+        type_badge=format_badge(filtered_items['item_type'], type_emoji),
+        conf_badge=format_badge(filtered_items['class_confidence_level'], conf_emoji),
+        validated_badge=np.where(filtered_items['validated'].to_numpy(), "✅ Si", "⏳ No"),
+        total_price_fmt=format_series(filtered_items['total_price'], EURO_FORMAT, 'N/A')
     )
 
     st.dataframe(
@@ -576,11 +830,16 @@ with tab_items:
 
     col_form1, col_form2 = st.columns([2, 1])
 
+    # Prima riga di ogni item: etichette delle opzioni e riga selezionata senza filtrare il frame
+    first_items = filtered_items.drop_duplicates('item_id')
+    item_ids = first_items['item_id'].tolist()
+    item_labels = dict(zip(item_ids, first_items['item_description'].str.slice(0, 50)))
+
     with col_form1:
         item_to_validate = st.selectbox(
             "Seleziona Item da Validare",
-            filtered_items['item_id'].tolist(),
-            format_func=lambda x: f"{x} - {filtered_items[filtered_items['item_id']==x].iloc[0]['item_description'][:50]}...",
+            item_ids,
+            format_func=lambda x: f"{x} - {item_labels[x]}...",
             key="items_validate_select"
         )
 
@@ -596,7 +855,7 @@ with tab_items:
                 st.rerun()
 
     if item_to_validate:
-        selected_item = filtered_items[filtered_items['item_id'] == item_to_validate].iloc[0]
+        selected_item = first_items.iloc[item_ids.index(item_to_validate)]
         
         st.markdown("**🔍 Item Selezionato:**")
         st.info(f"{selected_item['item_description']}")
@@ -623,18 +882,17 @@ with tab_items:
                     key="items_new_type"
                 )
                 
-                l1_options = items_df['class_l1'].dropna().unique().tolist()
-                current_l1_idx = l1_options.index(selected_item['class_l1']) if pd.notna(selected_item['class_l1']) and selected_item['class_l1'] in l1_options else 0
-                new_l1 = st.selectbox("Classe L1", l1_options, index=current_l1_idx, key="items_new_l1")
+                # Opzioni e indici precalcolati (valori mancanti o sconosciuti -> prima opzione)
+                class_options = load_class_options()
+                l1_options, l1_index = class_options['class_l1']
+                new_l1 = st.selectbox("Classe L1", l1_options, index=l1_index.get(selected_item['class_l1'], 0), key="items_new_l1")
             
             with col_val2:
-                l2_options = items_df['class_l2'].dropna().unique().tolist()
-                current_l2_idx = l2_options.index(selected_item['class_l2']) if pd.notna(selected_item['class_l2']) and selected_item['class_l2'] in l2_options else 0
-                new_l2 = st.selectbox("Classe L2", l2_options, index=current_l2_idx, key="items_new_l2")
+                l2_options, l2_index = class_options['class_l2']
+                new_l2 = st.selectbox("Classe L2", l2_options, index=l2_index.get(selected_item['class_l2'], 0), key="items_new_l2")
                 
-                l3_options = items_df['class_l3'].dropna().unique().tolist()
-                current_l3_idx = l3_options.index(selected_item['class_l3']) if pd.notna(selected_item['class_l3']) and selected_item['class_l3'] in l3_options else 0
-                new_l3 = st.selectbox("Classe L3", l3_options, index=current_l3_idx, key="items_new_l3")
+                l3_options, l3_index = class_options['class_l3']
+                new_l3 = st.selectbox("Classe L3", l3_options, index=l3_index.get(selected_item['class_l3'], 0), key="items_new_l3")
             
             notes = st.text_area("Note", placeholder="Aggiungi note sulla correzione...", key="items_validation_notes")
             
@@ -664,48 +922,47 @@ with tab_items:
 
     with col_exp2:
         if st.button("📥 Download Excel", use_container_width=True, key="items_export"):
-            from io import BytesIO
-            output = BytesIO()
-            
-            with pd.ExcelWriter(output, engine='xlsxwriter') as writer:
-                filtered_items.to_excel(writer, sheet_name='Items', index=False)
-                
-                if len(validations) > 0:
-                    val_df = pd.DataFrame.from_dict(validations, orient='index')
-                    val_df.to_excel(writer, sheet_name='Validazioni')
-            
             st.download_button(
                 label="⬇️ Scarica",
-                data=output.getvalue(),
+                data=build_items_xlsx(filtered_items, validations),
                 file_name=f"items_export_{datetime.now().strftime('%Y%m%d_%H%M%S')}.xlsx",
                 mime="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
                 key="items_download"
             )
 
+        if st.button("📥 Download Parquet", use_container_width=True, key="items_export_parquet"):
+            st.download_button(
+                label="⬇️ Scarica",
+                data=build_items_parquet(filtered_items),
+                file_name=f"items_export_{datetime.now().strftime('%Y%m%d_%H%M%S')}.parquet",
+                mime="application/vnd.apache.parquet",
+                key="items_download_parquet"
+            )
+
 # ==================== TAB SUPPLIERS ====================
 with tab_suppliers:
     st.header("🏢 Gestione Fornitori")
     st.markdown("Analizza i fornitori, esplora le specializzazioni e visualizza la distribuzione geografica")
     
-    # KPI Cards
+    # KPI Cards (aggregati in cache)
     col1, col2, col3, col4 = st.columns(4)
+    supplier_kpis = summarize_suppliers(supplier_stats)
 
     with col1:
         st.metric("🏢 Fornitori Totali", len(suppliers_df))
 
     with col2:
-        top_supplier = supplier_stats.nlargest(1, 'total_value').iloc[0] if len(supplier_stats) > 0 else None
-        if top_supplier is not None:
-            st.metric("🏆 Top Fornitore", top_supplier['display_name'][:20])
+        if supplier_kpis['top_supplier'] is not None:
+            st.metric("🏆 Top Fornitore", supplier_kpis['top_supplier'][:20])
         else:
             st.metric("🏆 Top Fornitore", "N/A")
 
     with col3:
-        total_value = supplier_stats['total_value'].sum()
+        total_value = supplier_kpis['total_value']
         st.metric("💰 Valore Totale", f"€{total_value:,.0f}")
 
     with col4:
-        avg_contracts = supplier_stats['n_contracts'].mean()
+        avg_contracts = supplier_kpis['avg_contracts']
         st.metric("📋 Avg Contratti", f"{avg_contracts:.1f}")
 
     # Filtri Fornitori
@@ -713,7 +970,7 @@ with tab_suppliers:
     col_s1, col_s2, col_s3 = st.columns(3)
 
     with col_s1:
-        specializations = ['Tutti'] + sorted(suppliers_df['specialization'].dropna().unique().tolist())
+        specializations = ['Tutti'] + suppliers_df['specialization'].cat.categories.tolist()
         spec_filter = st.selectbox("🎯 Specializzazione", specializations, key="suppliers_specialization")
 
     with col_s2:
@@ -753,29 +1010,17 @@ with tab_suppliers:
         with col_viz1:
             # Top 10 per valore
             st.markdown("##### 💰 Top 10 per Valore")
-            top_10_value = filtered_suppliers.nlargest(10, 'total_value')
-            fig_top_value = px.bar(
-                top_10_value,
-                x='total_value',
-                y='display_name',
-                orientation='h',
-                labels={'total_value': 'Valore Totale (€)', 'display_name': ''},
-                color='total_value',
-                color_continuous_scale='Blues'
-            )
-            fig_top_value.update_layout(yaxis={'categoryorder': 'total ascending'})
+            top_10_value = filtered_suppliers.nlargest(10, 'total_value')[['display_name', 'total_value']]
+            fig_top_value = pio.from_json(build_top_value_chart(top_10_value))
             st.plotly_chart(fig_top_value, use_container_width=True, key="suppliers_top_value")
 
         with col_viz2:
             # Distribuzione per specializzazione
             st.markdown("##### 🎯 Distribuzione Specializzazioni")
             spec_dist = filtered_suppliers['specialization'].value_counts()
+            spec_dist = spec_dist[spec_dist > 0]  # categorie senza fornitori nel filtro
             if len(spec_dist) > 0:
-                fig_spec = px.pie(
-                    values=spec_dist.values,
-                    names=spec_dist.index,
-                    color_discrete_sequence=px.colors.qualitative.Set3
-                )
+                fig_spec = pio.from_json(build_specialization_pie(spec_dist))
                 st.plotly_chart(fig_spec, use_container_width=True, key="suppliers_specialization_dist")
 
         # Tabella fornitori
@@ -853,7 +1098,7 @@ with tab_suppliers:
                         st.markdown("##### 🔄 Varianti Nome")
                         if pd.notna(supplier_full['name_variants']):
                             try:
-                                variants = json.loads(supplier_full['name_variants'])
+                                variants = parse_json_field(supplier_full['name_variants'])
                                 if variants:
                                     for variant in variants:
                                         st.write(f"- {variant}")
@@ -875,8 +1120,8 @@ with tab_suppliers:
                 if len(supplier_contracts) > 0:
                     display_contracts = supplier_contracts[['contract_id', 'contract_subject', 'start_date', 
                                                             'end_date', 'total_amount']].copy()
-                    display_contracts['start_date'] = pd.to_datetime(display_contracts['start_date']).dt.strftime('%d/%m/%Y')
-                    display_contracts['end_date'] = pd.to_datetime(display_contracts['end_date']).dt.strftime('%d/%m/%Y')
+                    display_contracts['start_date'] = display_contracts['start_date'].dt.strftime('%d/%m/%Y')
+                    display_contracts['end_date'] = display_contracts['end_date'].dt.strftime('%d/%m/%Y')
                     display_contracts['total_amount'] = display_contracts['total_amount'].apply(
                         lambda x: f"€{x:,.2f}" if pd.notna(x) else "N/A"
                     )
@@ -900,20 +1145,19 @@ with tab_suppliers:
                 if len(supplier_contracts) > 1:
                     st.markdown("##### 📈 Trend Storico")
                     
-                    trend_data = supplier_contracts.copy()
-                    trend_data['start_date'] = pd.to_datetime(trend_data['start_date'])
-                    trend_data = trend_data.sort_values('start_date')
-                    trend_data['year_month'] = trend_data['start_date'].dt.to_period('M').astype(str)
+                    # Chiave mese calcolata a parte: niente copia del frame dei contratti
+                    # (start_date è già datetime da load_data, groupby ordina i mesi)
+                    year_month = supplier_contracts['start_date'].dt.to_period('M').astype(str)
+                    trend_monthly = (
+                        supplier_contracts['total_amount'].groupby(year_month).sum()
+                        .rename_axis('year_month').reset_index()
+                    )
                     
-                    trend_monthly = trend_data.groupby('year_month')['total_amount'].sum().reset_index()
+                    # Serie lunghe: downsampling LTTB (forma della curva preservata, payload ridotto)
+                    if len(trend_monthly) > TREND_MAX_POINTS * 2:
+                        trend_monthly = trend_monthly.iloc[lttb_indices(trend_monthly['total_amount'], TREND_MAX_POINTS)]
                     
-                    fig_trend = px.line(
-                        trend_monthly,
-                        x='year_month',
-                        y='total_amount',
-                        markers=True,
-                        labels={'year_month': 'Periodo', 'total_amount': 'Valore (€)'}
-                    )
+                    fig_trend = pio.from_json(build_trend_chart(trend_monthly))
                     st.plotly_chart(fig_trend, use_container_width=True, key="suppliers_trend")
 
     else:
@@ -929,25 +1173,9 @@ with tab_suppliers:
 
     with col_exp2:
         if st.button("📥 Download Excel", use_container_width=True, key="suppliers_export"):
-            from io import BytesIO
-            
-            output = BytesIO()
-            
-            with pd.ExcelWriter(output, engine='xlsxwriter') as writer:
-                export_data = supplier_stats.merge(
-                    suppliers_df[['id', 'address', 'known_technologies', 'typical_categories']],
-                    on='id',
-                    how='left'
-                )
-                export_data.to_excel(writer, sheet_name='Fornitori', index=False)
-                
-                contracts_export = contracts_df[['contract_id', 'supplier', 'contract_subject', 
-                                                'start_date', 'end_date', 'total_amount']]
-                contracts_export.to_excel(writer, sheet_name='Contratti per Fornitore', index=False)
-            
             st.download_button(
                 label="⬇️ Scarica",
-                data=output.getvalue(),
+                data=build_suppliers_xlsx(supplier_stats, suppliers_df, contracts_df),
                 file_name=f"suppliers_export_{datetime.now().strftime('%Y%m%d_%H%M%S')}.xlsx",
                 mime="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
                 key="suppliers_download"